@@ -1,23 +1,633 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
-import pandas as pd
+import sqlite3
+import pickle
+import hashlib
+import mmap
+import struct
+import zlib
 import os
+import sys
+import csv
+import argparse
 import re
 import random
+import heapq
+import math
+import time
+import threading
+import gc
 import uuid # UUIDを生成するために追加
+import multiprocessing
+import functools
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict, Counter
 
 # --- データの保存先ファイル名 ---
 DATA_FILE = 'tag_dictionary.json'
 
+# --- 辞書の保存形式の設定 ---
+# 'json': 辞書JSONファイル + 変更ジャーナル、'sqlite': SQLiteデータベース (タグ単位でトランザクション更新)、
+# 'sharded': トップレベルカテゴリごとのJSONファイル (変更のあったファイルだけを書き直す。起動時は全てのファイルを読み込む)
+STORAGE_BACKEND = 'json'
+# STORAGE_BACKEND が 'sqlite' の場合の保存先 (存在しなければ初回起動時に DATA_FILE から取り込む)
+SQLITE_FILE = 'tag_dictionary.sqlite3'
+# STORAGE_BACKEND が 'sharded' の場合の保存先ディレクトリ (トップレベルカテゴリごとのファイルとマニフェスト)
+SHARD_DIRECTORY = 'tag_dictionary_shards'
+
+# --- 変更ジャーナルの設定 ---
+# True の場合、1件単位の変更は辞書ファイル全体を書き直さずジャーナル (DATA_FILE + '.journal') に追記する
+USE_JOURNAL = True
+# ジャーナルの記録件数がこの値に達したら辞書ファイルへ統合 (コンパクション) する
+JOURNAL_COMPACT_THRESHOLD = 1000
+
+# --- バイナリスナップショットの設定 ---
+# True の場合、読み込み済みの辞書を pickle 形式でも辞書ファイルの隣に保存し、次回起動時に優先して読み込む
+USE_BINARY_SNAPSHOT = True
+# バイナリスナップショットの形式の版数 (内容の形式を変えたら増やす)
+BINARY_SNAPSHOT_FORMAT = 1
+
+# --- 読み取り専用の辞書イメージの設定 ---
+# 複数のプロセスが mmap で共有して参照する辞書イメージの既定のファイル名 (コマンドラインの export-image で書き出す)
+DICTIONARY_IMAGE_FILE = 'tag_dictionary.img'
+
+# --- 検索インデックスのキャッシュの設定 ---
+# True の場合、検索インデックスの派生構造 (単語・部分文字列・近似一致) をキャッシュに保存し、
+# 起動時は辞書の内容が同じならキャッシュから読み込む (読み込み・再構築は裏で行う)
+USE_INDEX_CACHE = True
+# キャッシュの保存先ディレクトリ名 (辞書の保存先と同じディレクトリに作り、ファイル名に辞書の保存先の名前を含める)
+INDEX_CACHE_DIRECTORY = 'tag_dictionary_cache'
+# キャッシュの形式の版数 (派生構造の形式を変えたら増やす)
+INDEX_CACHE_SCHEMA_VERSION = 1
+
+# --- タグの列形式の表の設定 ---
+# True の場合、NumPy がインストールされていればタグの列形式の表 (TagColumns) を NumPy の配列で持ち、
+# 全タグの書き出し・検索などの一括処理を配列演算で行う (False の場合・未インストールの場合は Python のリストで行う)
+USE_NUMPY = True
+
+# --- 保存処理の設定 ---
+# 保存要求が途切れてから実際に書き込むまでの待ち時間 (秒)。この間の保存要求は1回の書き込みにまとめる
+SAVE_QUIET_PERIOD = 0.5
+
+# --- 並列分類の設定 ---
+# 分類ヒントの計算に使うワーカープロセス数 (None の場合はCPUコア数、1 の場合は常に逐次処理)
+CLASSIFY_WORKERS = None
+# 1タスクあたりに渡すタグ数
+CLASSIFY_CHUNK_SIZE = 500
+# この件数未満のタグはプロセス起動のコストが上回るため逐次処理する
+CLASSIFY_PARALLEL_MIN_TAGS = 50000
+# 分類ヒントのキャッシュに保持する最大件数
+HINT_CACHE_SIZE = 50000
+# 近似一致ヒントとして扱うトライグラム類似度 (Jaccard) の下限
+FUZZY_MIN_SIMILARITY = 0.5
+
+# --- 表データ ---
+# Treeview に表示する表の列
+TAG_TABLE_COLUMNS = ["英語タグ名", "日本語説明", "カテゴリ"]
+# 辞書管理タブの表の列 (_category_id は表示しない)
+DICT_TABLE_COLUMNS = ["英語タグ名", "日本語説明", "カテゴリ", "_category_id"]
+
+class RowTable:
+    """Treeview に表示する表データを保持する軽量な行ストア (行番号が Treeview の iid になる)"""
+
+    def __init__(self, columns, rows=()):
+        self.columns = list(columns)
+        # 欠けている値・None は空文字にそろえる
+        self.rows = [{column: ('' if row.get(column) is None else row.get(column)) for column in self.columns} for row in rows]
+        # 作成後に値が変更された行番号 (保存時にはこの行だけを処理する)
+        self.dirty_rows = set()
+
+    @classmethod
+    def from_columns(cls, columns, column_values):
+        """列ごとの値のリスト (None を含まないこと) から表を作成する"""
+        table = cls(columns)
+        table.rows = [dict(zip(table.columns, values)) for values in zip(*column_values)]
+        return table
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        """行がないかどうか"""
+        return not self.rows
+
+    def iter_rows(self):
+        """(行番号, 行の辞書) を順に返す"""
+        return enumerate(self.rows)
+
+    def set_value(self, row_index, column, value):
+        """指定した行・列の値を更新し、値が変わった場合は変更ありの行とする"""
+        row = self.rows[row_index]
+        if row[column] != value:
+            row[column] = value
+            self.dirty_rows.add(row_index)
+
+    def row_values(self, row_index, columns=None):
+        """指定した行の値を列の順に文字列のリストで返す"""
+        row = self.rows[row_index]
+        return [str(row[column]) for column in (columns or self.columns)]
+
+    def write_csv(self, file, header=True):
+        """表をCSVとしてファイルオブジェクトに書き出す"""
+        writer = csv.writer(file, lineterminator=os.linesep)
+        if header:
+            writer.writerow(self.columns)
+        writer.writerows([row[column] for column in self.columns] for row in self.rows)
+
+# --- 変更の記録 ---
+class ChangeTracker:
+    """保存先に未反映の変更 (変更ジャーナルと同じ形式の変更レコード) を記録するクラス"""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, record):
+        """変更レコードを記録する"""
+        self.records.append(record)
+
+    def take(self):
+        """記録した変更レコードを取り出し、記録を空にする"""
+        records = self.records
+        self.clear()
+        return records
+
+    def clear(self):
+        """記録を破棄する (辞書全体を保存した場合など)"""
+        self.records = []
+
+# --- タグレコード ---
+class TagRecord:
+    """辞書の1件のタグ (英語タグ名・日本語説明・英語タグ名(小文字)・所属カテゴリID) を保持するクラス
+
+    タグごとに dict を持つ代わりに __slots__ で属性を固定し、1件あたりのメモリを抑える。
+    英語タグ名(小文字)は作成時に1回だけ計算して intern し、カテゴリIDはカテゴリと同じ文字列を共有する。
+    既存のコードから tag['en'] / tag.get('ja') の形でも読み書きでき、保存時は to_json で元のJSON形式に戻す。
+    """
+
+    __slots__ = ('en', 'ja', 'en_lower', 'category_id', 'row')
+    FIELDS = ('en', 'ja')
+
+    def __init__(self, en, ja, category_id=None):
+        self.en = en
+        self.ja = ja
+        self.en_lower = intern_lower(en)
+        self.category_id = category_id
+        self.row = None  # タグの列形式の表 (TagColumns) での行番号
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        if key == 'en':
+            self.en_lower = intern_lower(value)
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def get(self, key, default=None):
+        # dict と同じく、値があればそれを (None でも) 返し、ない項目だけ default を返す
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def to_json(self):
+        """辞書JSONファイルに書き込む形 ({"en": ..., "ja": ...}) に変換する"""
+        return {"en": self.en, "ja": self.ja}
+
+    def __repr__(self):
+        return f"TagRecord(en={self.en!r}, ja={self.ja!r}, category_id={self.category_id!r})"
+
+def intern_lower(text):
+    """文字列を小文字にして intern する関数 (元から小文字の場合は新しい文字列を作らず元の文字列を返す)"""
+    text_lower = text.lower()
+    return text if text_lower == text else sys.intern(text_lower)
+
+def attach_tag_records(dictionary):
+    """読み込んだ辞書データのタグ (JSONの dict) を TagRecord に置き換える関数 (置き換え済みのタグはそのまま)"""
+    for category in dictionary.get('categories', []):
+        category_id = category.get('id')
+        category['tags'] = [
+            tag if isinstance(tag, TagRecord) and tag.category_id == category_id
+            else TagRecord(tag['en'], tag.get('ja'), category_id)
+            for tag in category.get('tags', [])
+        ]
+
+def tag_to_json(tag):
+    """タグ (TagRecord または読み込んだままの dict) を辞書JSONファイルに書き込む形に変換する関数"""
+    return tag.to_json() if isinstance(tag, TagRecord) else dict(tag)
+
+# --- 辞書データの索引 ---
+class DictionaryStore:
+    """辞書データを保持し、カテゴリID・親カテゴリID・英語タグ名からの索引を保つクラス
+
+    カテゴリ・タグの追加・削除は「辞書の変更」の関数 (insert_category / insert_tag など) から行う。
+    カテゴリの階層は深さ優先の訪問順の区間 (get_tree_intervals) でも持ち、タグの列形式の表はこの区間で子孫のタグを選ぶ。
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.categories = dictionary.setdefault('categories', [])
+        self.categories_by_id = {}       # カテゴリID -> カテゴリ (同じIDが複数ある場合は先のもの)
+        self.children_by_parent_id = {}  # 親カテゴリID (トップレベルは None) -> 子カテゴリのリスト (辞書順)
+        self.tags_by_en_lower = {}       # 英語タグ名(小文字) -> タグのリスト (辞書に登録された順)
+        self.tree_intervals = None       # カテゴリID -> 深さ優先の訪問順でのカテゴリとその子孫の区間 (階層が変わったら None に戻す)
+        for category in self.categories:
+            self.index_category(category)
+
+    def index_category(self, category):
+        self.categories_by_id.setdefault(category['id'], category)
+        self.children_by_parent_id.setdefault(category.get('parent_id'), []).append(category)
+        for tag in category.get('tags', []):
+            self.index_tag(tag)
+        self.tree_intervals = None
+
+    def index_tag(self, tag):
+        self.tags_by_en_lower.setdefault(tag.en_lower, []).append(tag)
+
+    def unindex_tag(self, tag):
+        tags = self.tags_by_en_lower.get(tag.en_lower)
+        if not tags:
+            return
+        tags[:] = [t for t in tags if t is not tag]
+        if not tags:
+            del self.tags_by_en_lower[tag.en_lower]
+
+    def add_category(self, category):
+        """カテゴリを辞書データの末尾に追加する"""
+        self.categories.append(category)
+        self.index_category(category)
+
+    def remove_category(self, category_id):
+        """指定したIDのカテゴリを辞書データから削除する"""
+        removed = [cat for cat in self.categories if cat['id'] == category_id]
+        if not removed:
+            return
+        self.categories[:] = [cat for cat in self.categories if cat['id'] != category_id]
+        del self.categories_by_id[category_id]
+        for category in removed:
+            siblings = self.children_by_parent_id[category.get('parent_id')]
+            siblings[:] = [cat for cat in siblings if cat is not category]
+            if not siblings:
+                del self.children_by_parent_id[category.get('parent_id')]
+            for tag in category.get('tags', []):
+                self.unindex_tag(tag)
+        self.tree_intervals = None
+
+    def add_tag(self, category, tag):
+        """カテゴリの末尾にタグを追加する"""
+        category.setdefault('tags', []).append(tag)
+        self.index_tag(tag)
+
+    def remove_tags(self, category, tags_to_remove):
+        """カテゴリから指定したタグを削除する"""
+        removing_ids = {id(tag) for tag in tags_to_remove}
+        category['tags'] = [tag for tag in category.get('tags', []) if id(tag) not in removing_ids]
+        for tag in tags_to_remove:
+            self.unindex_tag(tag)
+
+    def get_category(self, category_id):
+        """カテゴリIDからカテゴリを返す (見つからなければ None)"""
+        return self.categories_by_id.get(category_id)
+
+    def get_children(self, parent_id):
+        """親カテゴリID (None の場合はトップレベル) の子カテゴリを辞書順で返す"""
+        return self.children_by_parent_id.get(parent_id, [])
+
+    def find_child_by_name(self, parent_id, name):
+        """親カテゴリの子から名前が一致する (大文字小文字を区別しない) カテゴリを返す (見つからなければ None)"""
+        name_lower = name.lower()
+        return next((cat for cat in self.get_children(parent_id) if cat['name'].lower() == name_lower), None)
+
+    def get_tree_intervals(self):
+        """カテゴリの階層を深さ優先・辞書順にたどり、カテゴリID -> 区間 の辞書を返す
+
+        カテゴリの区間 (start, end) は訪問順でそのカテゴリと子孫が並ぶ範囲 [start, end) になる。
+        トップレベルのカテゴリ、親が見つからないカテゴリ、(循環参照で) まだ訪れていないカテゴリの順に起点にし、
+        同じIDのカテゴリは先のものだけを1回たどる。階層が変わるまでは前回の結果を使う。
+        """
+        if self.tree_intervals is None:
+            visited_count = 0
+            intervals = {}
+            roots = [cat for cat in self.categories if cat.get('parent_id') is None or cat['parent_id'] not in self.categories_by_id]
+            for root_category in roots + self.categories:
+                if root_category['id'] in intervals:
+                    continue
+                # (カテゴリ, 子を積んだ後か) のスタックで、子孫を全て訪れた時点で区間の終わりを確定させる
+                stack = [(root_category, False)]
+                while stack:
+                    category, exiting = stack.pop()
+                    if exiting:
+                        intervals[category['id']] = (intervals[category['id']][0], visited_count)
+                        continue
+                    if category['id'] in intervals:
+                        continue
+                    intervals[category['id']] = (visited_count, None)
+                    visited_count += 1
+                    stack.append((category, True))
+                    stack.extend((child, False) for child in reversed(self.get_children(category['id'])))
+            self.tree_intervals = intervals
+        return self.tree_intervals
+
+    def find_tag(self, tag_en, category_id=None):
+        """英語タグ名 (大文字小文字を区別しない) から (カテゴリ, タグ) を返す (見つからなければ None)
+
+        category_id を指定した場合はそのカテゴリのタグだけを対象にする。
+        同じ英語タグ名が複数ある場合は辞書に先に登録されたタグを返す。
+        """
+        for tag in self.tags_by_en_lower.get(tag_en.lower(), ()):
+            if category_id is None or tag.category_id == category_id:
+                return self.get_category(tag.category_id), tag
+        return None
+
+    def find_all_tags(self, tag_en):
+        """英語タグ名 (大文字小文字を区別しない) が一致する全ての (カテゴリ, タグ) を辞書に登録された順で返す"""
+        return [(self.get_category(tag.category_id), tag) for tag in self.tags_by_en_lower.get(tag_en.lower(), ())]
+
+    def find_duplicate_tags(self):
+        """英語タグ名 (大文字小文字を区別しない) が重複しているタグを [[(カテゴリ, タグ), ...], ...] で返す
+
+        重複ごとの (カテゴリ, タグ) は辞書に登録された順で、重複は英語タグ名が最初に登録された順に並べる。
+        英語タグ名からの索引を1回たどるだけで求める。
+        """
+        return [[(self.get_category(tag.category_id), tag) for tag in tags]
+                for tags in self.tags_by_en_lower.values() if len(tags) > 1]
+
+# --- タグの列形式の表 ---
+def import_numpy():
+    """NumPy を読み込んで返す関数 (USE_NUMPY が False の場合・インストールされていないか 2.0 より古い場合は None)"""
+    if not USE_NUMPY:
+        return None
+    try:
+        import numpy # 列形式の表を作る時だけ読み込む
+    except ImportError:
+        return None
+    if not hasattr(numpy, 'strings'):
+        return None # 文字列の配列演算 (StringDType, numpy.strings) は NumPy 2.0 以降が必要
+    return numpy
+
+class TagColumns:
+    """辞書の全タグを列 (英語タグ名・小文字・日本語説明・小文字・カテゴリ番号) ごとの配列で持つ表
+
+    全タグの書き出しや検索などの一括処理を、タグごとのループではなく列全体への配列演算で行うために使う。
+    NumPy がある場合は文字列の列を StringDType、カテゴリ番号の列を int32 の配列で持ち、ない場合はリストで持つ。
+    行はタグの登録順に追加し、削除した行は alive を False にして残す (行番号は TagRecord.row に記録する)。
+    辞書データの変更は「辞書の変更」の関数から append / remove / update_ja などで反映する。
+    """
+
+    STRING_COLUMNS = ('en', 'en_lower', 'ja', 'ja_lower')
+
+    def __init__(self, categories):
+        self.np = import_numpy()
+        self.records = []            # 行番号 -> TagRecord (削除した行は None)
+        self.category_ids = []       # カテゴリ番号 -> カテゴリID (削除したカテゴリは None)
+        self.category_numbers = {}   # カテゴリID -> カテゴリ番号 (同じIDが複数ある場合は先のもの)
+        values = {name: [] for name in self.STRING_COLUMNS + ('category_index',)}
+        for category in categories:
+            category_number = self.add_category(category)
+            for tag in category.get('tags', []):
+                tag.row = len(self.records)
+                self.records.append(tag)
+                for name, value in zip(values, self.get_row_values(tag, category_number)):
+                    values[name].append(value)
+        self.size = len(self.records)
+        if self.np is None:
+            self.columns = values
+            self.columns['alive'] = [True] * self.size
+        else:
+            string_dtype = self.np.dtypes.StringDType()
+            self.columns = {name: self.np.array(values[name], dtype=string_dtype) for name in self.STRING_COLUMNS}
+            self.columns['category_index'] = self.np.array(values['category_index'], dtype=self.np.int32)
+            self.columns['alive'] = self.np.ones(self.size, dtype=bool)
+
+    @staticmethod
+    def get_row_values(tag, category_number):
+        """タグの行の値を列の順 (STRING_COLUMNS, カテゴリ番号) で返す"""
+        tag_ja = tag.ja or ''
+        return tag.en, tag.en_lower, tag_ja, tag_ja.lower(), category_number
+
+    # --- 表の更新 ---
+    def add_category(self, category):
+        """カテゴリにカテゴリ番号を割り当てて返す"""
+        category_number = len(self.category_ids)
+        self.category_ids.append(category['id'])
+        self.category_numbers.setdefault(category['id'], category_number)
+        return category_number
+
+    def remove_category(self, category_id):
+        """カテゴリとそのタグの行を表から取り除く"""
+        if category_id not in self.category_numbers:
+            return
+        for row in self.filter_categories(self.get_live_rows(), [category_id]):
+            self.remove(self.records[row])
+        self.category_ids[self.category_numbers.pop(category_id)] = None
+
+    def append(self, tag):
+        """タグの行を末尾に追加する"""
+        category_number = self.category_numbers.get(tag.category_id)
+        if category_number is None:
+            return
+        if self.np is not None and self.size == len(self.columns['alive']):
+            # 配列は容量を倍にして確保し直し、追加のたびに全体を複製しないようにする
+            extra = max(self.size, 16)
+            for name, column in self.columns.items():
+                self.columns[name] = self.np.concatenate([column, self.np.zeros(extra, dtype=column.dtype)])
+        tag.row = self.size
+        self.records.append(tag)
+        for name, value in zip(self.STRING_COLUMNS + ('category_index', 'alive'), self.get_row_values(tag, category_number) + (True,)):
+            if self.np is None:
+                self.columns[name].append(value)
+            else:
+                self.columns[name][self.size] = value
+        self.size += 1
+
+    def remove(self, tag):
+        """タグの行を削除済みにする"""
+        if tag.row is None or self.records[tag.row] is not tag:
+            return
+        self.columns['alive'][tag.row] = False
+        self.records[tag.row] = None
+
+    def update_ja(self, tag):
+        """タグの日本語説明の変更を行に反映する"""
+        if tag.row is None or self.records[tag.row] is not tag:
+            return
+        tag_ja = tag.ja or ''
+        self.columns['ja'][tag.row] = tag_ja
+        self.columns['ja_lower'][tag.row] = tag_ja.lower()
+
+    # --- 行の選択 (行番号のリスト・配列を受け取り、順序を保ったまま絞り込む) ---
+    def get_live_rows(self):
+        """削除されていない全ての行の行番号を登録順で返す"""
+        if self.np is None:
+            return [row for row, alive in enumerate(self.columns['alive']) if alive]
+        return self.np.flatnonzero(self.columns['alive'][:self.size])
+
+    def get_rows_in_category_order(self, category_ids=None):
+        """指定したカテゴリ (None の場合は全カテゴリを辞書順) の行を、カテゴリの順・カテゴリ内は登録順で返す"""
+        if category_ids is None:
+            category_numbers = [number for number, category_id in enumerate(self.category_ids) if category_id is not None]
+        else:
+            category_numbers = [self.category_numbers[category_id] for category_id in category_ids if category_id in self.category_numbers]
+        if self.np is None:
+            rank = dict(zip(category_numbers, range(len(category_numbers))))
+            category_index = self.columns['category_index']
+            rows = [row for row in self.get_live_rows() if category_index[row] in rank]
+            return sorted(rows, key=lambda row: rank[category_index[row]])
+        rank = self.np.full(len(self.category_ids), -1, dtype=self.np.int32)
+        rank[self.np.asarray(category_numbers, dtype=self.np.intp)] = self.np.arange(len(category_numbers), dtype=self.np.int32)
+        row_ranks = rank[self.columns['category_index'][:self.size]]
+        rows = self.np.flatnonzero(self.columns['alive'][:self.size] & (row_ranks >= 0))
+        return rows[self.np.argsort(row_ranks[rows], kind='stable')]
+
+    def get_subtree_rows(self, store, category_id):
+        """カテゴリとその子孫のタグの行を、カテゴリの階層順 (深さ優先・辞書順)・カテゴリ内は登録順で返す"""
+        start, end = store.get_tree_intervals().get(category_id, (0, 0))
+        positions = self.get_tree_positions(store)
+        if self.np is None:
+            category_index = self.columns['category_index']
+            rows = [row for row in self.get_live_rows() if start <= positions[category_index[row]] < end]
+            return sorted(rows, key=lambda row: positions[category_index[row]])
+        row_positions = positions[self.columns['category_index'][:self.size]]
+        rows = self.np.flatnonzero(self.columns['alive'][:self.size] & (row_positions >= start) & (row_positions < end))
+        return rows[self.np.argsort(row_positions[rows], kind='stable')]
+
+    def filter_subtree(self, rows, store, category_id):
+        """行のうち、カテゴリ自身またはその子孫に属する行だけを返す (カテゴリの階層の区間で判定する)"""
+        start, end = store.get_tree_intervals().get(category_id, (0, 0))
+        positions = self.get_tree_positions(store)
+        if self.np is None:
+            category_index = self.columns['category_index']
+            return [row for row in rows if start <= positions[category_index[row]] < end]
+        rows = self.np.asarray(rows, dtype=self.np.intp)
+        row_positions = positions[self.columns['category_index'][rows]]
+        return rows[(row_positions >= start) & (row_positions < end)]
+
+    def filter_categories(self, rows, category_ids):
+        """行のうち、指定したカテゴリに属する行だけを返す"""
+        category_numbers = {self.category_numbers[category_id] for category_id in category_ids if category_id in self.category_numbers}
+        if self.np is None:
+            category_index = self.columns['category_index']
+            return [row for row in rows if category_index[row] in category_numbers]
+        rows = self.np.asarray(rows, dtype=self.np.intp)
+        return rows[self.np.isin(self.columns['category_index'][rows], self.np.fromiter(category_numbers, dtype=self.np.int32))]
+
+    def filter_containing(self, rows, query_lower, match_category_path=False):
+        """行のうち、英語タグ名・日本語説明 (match_category_path=True の場合はカテゴリパスも) が query_lower を含む行だけを返す"""
+        if not query_lower:
+            return rows
+        category_matches = [match_category_path and query_lower in path.lower() for path in self.get_category_paths()]
+        if self.np is None:
+            columns = self.columns
+            return [row for row in rows
+                    if query_lower in columns['en_lower'][row] or query_lower in columns['ja_lower'][row]
+                    or category_matches[columns['category_index'][row]]]
+        rows = self.np.asarray(rows, dtype=self.np.intp)
+        mask = self.np.strings.find(self.columns['en_lower'][rows], query_lower) >= 0
+        mask |= self.np.strings.find(self.columns['ja_lower'][rows], query_lower) >= 0
+        if any(category_matches):
+            mask |= self.np.array(category_matches, dtype=bool)[self.columns['category_index'][rows]]
+        return rows[mask]
+
+    def filter_without_ja(self, rows):
+        """行のうち、日本語説明がない (空または「説明なし」) 行だけを返す"""
+        if self.np is None:
+            ja = self.columns['ja']
+            return [row for row in rows if ja[row] in ('', '説明なし')]
+        rows = self.np.asarray(rows, dtype=self.np.intp)
+        ja = self.columns['ja'][rows]
+        return rows[(ja == '') | (ja == '説明なし')]
+
+    def join_en(self, tags_en):
+        """英語タグ名 (大文字小文字を区別しない) のリストに対応する行番号のリストを返す (見つからなければ -1)
+
+        同じ英語タグ名の行が複数ある場合は先に登録された行を返す (DictionaryStore.find_tag と同じ)。
+        """
+        if self.np is None:
+            first_rows = {}
+            for row in reversed(self.get_live_rows()):
+                first_rows[self.columns['en_lower'][row]] = row
+            return [first_rows.get(tag_en.lower(), -1) for tag_en in tags_en]
+        live_rows = self.get_live_rows()
+        if not len(live_rows) or not tags_en:
+            return [-1] * len(tags_en)
+        # 表の英語タグ名(小文字)の後ろに探す英語タグ名をつなげて安定ソートすると、同じ値の並びの先頭が
+        # 登録順で最初の行になる (並びの先頭が探す側の値なら表に一致する行はない)
+        keys = self.np.array([tag_en.lower() for tag_en in tags_en], dtype=self.np.dtypes.StringDType())
+        combined = self.np.concatenate([self.columns['en_lower'][live_rows], keys])
+        order = self.np.argsort(combined, kind='stable')
+        sorted_keys = combined[order]
+        starts_run = self.np.ones(len(sorted_keys), dtype=bool)
+        starts_run[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        run_heads = order[self.np.maximum.accumulate(self.np.where(starts_run, self.np.arange(len(order)), 0))]
+        matched_rows = self.np.full(len(keys), -1, dtype=self.np.intp)
+        is_key = order >= len(live_rows)
+        found = is_key & (run_heads < len(live_rows))
+        matched_rows[order[found] - len(live_rows)] = live_rows[run_heads[found]]
+        return matched_rows.tolist()
+
+    # --- 値の取り出し ---
+    def get_category_paths(self):
+        """カテゴリ番号 -> カテゴリパス のリストを返す (カテゴリパスのキャッシュから引く)"""
+        return [get_category_path(category_id) if category_id is not None else "" for category_id in self.category_ids]
+
+    def get_tree_positions(self, store):
+        """カテゴリ番号 -> カテゴリの階層での訪問順 (DictionaryStore.get_tree_intervals の区間の始まり) を返す
+
+        階層にないカテゴリ・削除したカテゴリ・同じIDの2つ目以降のカテゴリは -1 にする。
+        """
+        intervals = store.get_tree_intervals()
+        positions = [intervals[category_id][0]
+                     if category_id in intervals and self.category_numbers.get(category_id) == category_number else -1
+                     for category_number, category_id in enumerate(self.category_ids)]
+        if self.np is None:
+            return positions
+        return self.np.array(positions, dtype=self.np.int32)
+
+    def get_values(self, rows, column):
+        """行の値を行の順にリストで返す (column には列名のほか 'category_path' を指定できる)"""
+        if column == 'category_path':
+            category_paths = self.get_category_paths()
+            return [category_paths[category_number] for category_number in self.get_values(rows, 'category_index')]
+        if self.np is None:
+            values = self.columns[column]
+            return [values[row] for row in rows]
+        return self.columns[column][self.np.asarray(rows, dtype=self.np.intp)].tolist()
+
+    def get_records(self, rows):
+        """行のタグ (TagRecord) を行の順にリストで返す"""
+        return [self.records[row] for row in rows]
+
 # --- アプリケーションのグローバル状態管理 ---
 app_state = {
     'dictionary': {"categories": []},
-    'unclassified_df': pd.DataFrame(columns=["英語タグ名", "日本語説明", "カテゴリ"]),
-    'edited_dict_df': pd.DataFrame(columns=["英語タグ名", "日本語説明", "カテゴリ", "_category_id"]),
+    # 辞書データとその索引 (set_dictionary で辞書データと一緒に差し替える)
+    'store': None,
+    # タグの列形式の表 (get_tag_columns で初めて使う時に作成し、以降は辞書の変更関数が更新する)
+    'tag_columns': None,
+    'unclassified_table': RowTable(TAG_TABLE_COLUMNS),
+    'edited_dict_table': RowTable(DICT_TABLE_COLUMNS),
     'selected_generating_tags': [],
-    'random_generated_tags': []
+    'random_generated_tags': [],
+    # 分類ヒント用の検索インデックス (rebuild_tag_index で構築)
+    'tag_index': None,
+    # 検索インデックスの派生構造を裏で用意している TagIndexLoader (用意ができて取り込んだら None)
+    'tag_index_loader': None,
+    # カテゴリパスのキャッシュ (カテゴリ構造の変更時に invalidate_category_path_cache で破棄)
+    'category_path_cache': None,
+    # 辞書の変更ごとに増える版数 (分類ヒントのキャッシュキーに使用)
+    'dictionary_version': 0,
+    # 辞書の保存先 (get_dictionary_storage で作成)
+    'storage': None,
+    # 保存先に未反映の変更 (辞書の変更関数が記録し、commit_changes で保存先に反映する)
+    'changes': ChangeTracker()
 }
+app_state['store'] = DictionaryStore(app_state['dictionary'])
 
 # グローバルなソート方向を保持する辞書
 # キー: (tree_widget_name, column_id), 値: True (降順) または False (昇順)
@@ -25,50 +635,1672 @@ sort_reverse_flags = {}
 
 # --- ヘルパー関数 ---
 
-def load_dictionary():
-    """辞書データをファイルから読み込む関数"""
-    if os.path.exists(DATA_FILE):
+def strip_tag_descriptions(category):
+    """カテゴリ内の全てのタグの日本語説明をstripする関数"""
+    for tag in category.get('tags', []):
+        if 'ja' in tag and tag['ja'] is not None:
+            tag['ja'] = tag['ja'].strip()
+
+def read_dictionary_file(filepath):
+    """辞書JSONファイルを読み込み、全てのタグの日本語説明をstripした辞書データを返す関数"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        dictionary = json.load(f)
+    # 読み込み時に全てのタグの日本語説明をstripする
+    for category in dictionary.get('categories', []):
+        strip_tag_descriptions(category)
+    return dictionary
+
+class StreamingCategoryReader:
+    """辞書JSONファイルの categories 配列を、ファイル全体を読み込まずに1要素ずつ返すリーダー"""
+
+    BLOCK_SIZE = 1 << 20
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.found_categories = False  # categories キーが見つかったかどうか (読み終えた後に参照する)
+        self.decoder = json.JSONDecoder()
+        self.file = None
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self, size=None):
+        """ファイルの続きをバッファに読み込む (読み終えた部分は捨てる)。読み込めなければ False を返す"""
+        if self.eof:
+            return False
+        chunk = self.file.read(size or self.BLOCK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """空白を読み飛ばして次の文字を返す (ファイルの終端では空文字)"""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def expect(self, char):
+        """次の文字が char であることを確認して読み進める"""
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"'{char}' が必要です", self.buffer, self.pos)
+        self.pos += 1
+
+    def decode_value(self):
+        """次のJSON値を1つ読み込んで返す"""
+        self.peek()
+        read_size = self.BLOCK_SIZE
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # 数値などはバッファの末尾で途切れていても読めてしまうため、続きがあり得る場合は読み足す
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # 大きな値でも読み直しの回数が増えすぎないよう、読み足す量を倍々にする
+            read_size *= 2
+            self.read_more(read_size)
+
+    def __iter__(self):
+        with open(self.filepath, 'r', encoding='utf-8') as f:
+            self.file = f
+            self.expect('{')
+            if self.peek() == '}':
+                return
+            while True:
+                key = self.decode_value()
+                if not isinstance(key, str):
+                    raise json.JSONDecodeError("オブジェクトのキーが必要です", self.buffer, self.pos)
+                self.expect(':')
+                if key == 'categories':
+                    self.found_categories = True
+                    self.expect('[')
+                    if self.peek() == ']':
+                        self.pos += 1
+                    else:
+                        while True:
+                            yield self.decode_value()
+                            if self.peek() == ',':
+                                self.pos += 1
+                                continue
+                            self.expect(']')
+                            break
+                else:
+                    # categories 以外の値は読み捨てる
+                    self.decode_value()
+                if self.peek() == ',':
+                    self.pos += 1
+                    continue
+                self.expect('}')
+                return
+
+def read_dictionary_file_streaming(filepath):
+    """辞書JSONファイルをカテゴリごとに読み込み、全てのタグの日本語説明をstripした辞書データを返す関数"""
+    categories = []
+    for category in StreamingCategoryReader(filepath):
+        strip_tag_descriptions(category)
+        categories.append(category)
+    return {"categories": categories}
+
+def get_binary_snapshot_path(data_file):
+    """辞書ファイルに対応するバイナリスナップショットのパスを返す関数"""
+    return os.path.splitext(data_file)[0] + '.pickle'
+
+def hash_file(filepath):
+    """ファイル内容のハッシュ値を返す関数"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_binary_snapshot(data_file, dictionary):
+    """辞書ファイルの現在の内容に対応するバイナリスナップショットを書き込む関数"""
+    stat = os.stat(data_file)
+    payload = {
+        'format': BINARY_SNAPSHOT_FORMAT,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_size': stat.st_size,
+        'source_hash': hash_file(data_file),
+        'dictionary': dictionary
+    }
+    snapshot_path = get_binary_snapshot_path(data_file)
+    temp_path = snapshot_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=5)
+    os.replace(temp_path, snapshot_path)
+
+def read_binary_snapshot(data_file):
+    """辞書ファイルと内容が一致するバイナリスナップショットがあれば辞書データを返す関数 (なければ None)"""
+    snapshot_path = get_binary_snapshot_path(data_file)
+    if not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or payload.get('format') != BINARY_SNAPSHOT_FORMAT:
+        return None
+    stat = os.stat(data_file)
+    if stat.st_size != payload['source_size']:
+        return None
+    # 更新日時が異なる場合 (コピーや touch など) は内容のハッシュで一致を確認する
+    if stat.st_mtime_ns != payload['source_mtime_ns'] and hash_file(data_file) != payload['source_hash']:
+        return None
+    return payload['dictionary']
+
+def read_dictionary_with_snapshot(data_file):
+    """有効なバイナリスナップショットがあればそれを、なければ辞書JSONファイルを読み込む関数"""
+    if not USE_BINARY_SNAPSHOT:
+        return read_dictionary_file(data_file)
+    dictionary = read_binary_snapshot(data_file)
+    if dictionary is None:
+        dictionary = read_dictionary_file(data_file)
         try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                app_state['dictionary'] = json.load(f)
-            # 読み込み時に全てのタグの日本語説明をstripする
-            for category in app_state['dictionary'].get('categories', []):
-                for tag in category.get('tags', []):
-                    if 'ja' in tag and tag['ja'] is not None:
-                        tag['ja'] = tag['ja'].strip()
-        except json.JSONDecodeError:
-            messagebox.showerror("エラー", "辞書ファイルが破損しているようです。新しい辞書を作成します。")
-            app_state['dictionary'] = {"categories": []}
-    else:
-        app_state['dictionary'] = {"categories": []}
+            write_binary_snapshot(data_file, dictionary)
+        except OSError as e:
+            print(f"バイナリスナップショットを保存できませんでした: {e}", file=sys.stderr)
+    return dictionary
+
+def load_dictionary():
+    """辞書データを保存先から読み込む関数"""
+    try:
+        dictionary = get_dictionary_storage().load()
+    except (json.JSONDecodeError, sqlite3.DatabaseError):
+        messagebox.showerror("エラー", "辞書ファイルが破損しているようです。新しい辞書を作成します。")
+        dictionary = {"categories": []}
     
-    app_state['edited_dict_df'] = pd.DataFrame(columns=["英語タグ名", "日本語説明", "カテゴリ", "_category_id"])
+    app_state['changes'].clear()
+    # 検索インデックスの派生構造はキャッシュからの読み込みまたは再構築を裏で行い、用意ができたら取り込む
+    set_dictionary(dictionary, background_index=True)
+    install_tag_index_when_ready()
+    app_state['edited_dict_table'] = RowTable(DICT_TABLE_COLUMNS)
     update_category_dropdowns() # all_category_options をここで更新
 
+def set_dictionary(dictionary, background_index=False, dictionary_path=None):
+    """辞書データを差し替え、索引・カテゴリパスのキャッシュ・検索インデックスを作り直す関数
+
+    dictionary_path は辞書の保存先のパスで、検索インデックスのキャッシュの置き場所に使う (None の場合はアプリの保存先)。
+    """
+    attach_tag_records(dictionary)
+    app_state['dictionary'] = dictionary
+    app_state['store'] = DictionaryStore(dictionary)
+    app_state['tag_columns'] = None
+    invalidate_category_path_cache()
+    rebuild_tag_index(background=background_index, dictionary_path=dictionary_path)
+
 def save_dictionary():
-    """辞書データをファイルに保存する関数"""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(app_state['dictionary'], f, ensure_ascii=False, indent=4)
+    """辞書データ全体を保存先に保存する関数 (記録済みの変更も含まれるため記録は破棄する)"""
+    get_dictionary_storage().save_all(app_state['dictionary'])
+    app_state['changes'].clear()
+
+def snapshot_dictionary(dictionary):
+    """保存用に辞書データを複製する関数 (書き込み中にUI側で辞書が変更されても影響を受けないようにする)"""
+    snapshot = dict(dictionary)
+    snapshot['categories'] = []
+    for category in dictionary.get('categories', []):
+        category_copy = dict(category)
+        if 'tags' in category_copy:
+            category_copy['tags'] = [tag_to_json(tag) for tag in category_copy['tags']]
+        snapshot['categories'].append(category_copy)
+    return snapshot
+
+def write_dictionary_snapshot(data_file, snapshot):
+    """スナップショットを一時ファイル経由で辞書ファイルに書き込む関数 (統合済みのジャーナルの削除は呼び出し元で行う)"""
+    temp_path = data_file + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    # 置き換えは不可分に行われるため、途中で終了しても辞書ファイルは古い内容か新しい内容のどちらかになる
+    os.replace(temp_path, data_file)
+    if USE_BINARY_SNAPSHOT:
+        # スナップショットは読み込み時と同じく日本語説明をstripした状態で保存する
+        for category in snapshot.get('categories', []):
+            for tag in category.get('tags', []):
+                if tag.get('ja') is not None:
+                    tag['ja'] = tag['ja'].strip()
+        try:
+            write_binary_snapshot(data_file, snapshot)
+        except OSError as e:
+            print(f"バイナリスナップショットを保存できませんでした: {e}", file=sys.stderr)
+
+def write_file_atomically(filepath, content):
+    """バイト列を一時ファイル経由でファイルに書き込む関数"""
+    temp_path = filepath + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, filepath)
+
+def remove_file_if_exists(filepath):
+    """ファイルが存在すれば削除する関数"""
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+class DictionaryWriter:
+    """辞書ファイルの書き込みを専用スレッドで行い、短時間に続いた保存要求を1回の書き込みにまとめるクラス"""
+
+    def __init__(self, quiet_period=SAVE_QUIET_PERIOD):
+        self.quiet_period = quiet_period
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()   # 未処理の保存要求 (書き込み先 -> 書き込み処理)
+        self.last_request_time = 0.0
+        self.writing = False
+        self.flush_requested = False
+        self.errors = {}               # 書き込み先 -> 最後の書き込みで発生した例外 (flush で呼び出し元に送出する)
+        self.thread = None
+
+    def submit(self, key, job):
+        """保存要求を登録する (同じ書き込み先の未処理の要求があれば新しい要求で置き換える)"""
+        with self.condition:
+            self.pending.pop(key, None)
+            self.pending[key] = job
+            self.last_request_time = time.monotonic()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="DictionaryWriter", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def run(self):
+        """保存要求を待ち、静止期間が経過したら書き込み先ごとに最新の要求だけを実行する"""
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                while not self.flush_requested:
+                    remaining = self.last_request_time + self.quiet_period - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                jobs = list(self.pending.items())
+                self.pending.clear()
+                self.writing = True
+            try:
+                # 1件の書き込みに失敗しても、残りの書き込み先の要求は実行する。
+                # 同じ書き込み先の後の書き込みが成功すれば、以前の失敗は解消したものとして忘れる
+                for key, job in jobs:
+                    try:
+                        job()
+                    except Exception as e:
+                        print(f"辞書ファイルの保存中にエラーが発生しました: {e}", file=sys.stderr)
+                        with self.condition:
+                            self.errors[key] = e
+                    else:
+                        with self.condition:
+                            self.errors.pop(key, None)
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def flush(self):
+        """未処理の保存要求を直ちに書き込み、完了まで待つ (書き込みに失敗していた場合は例外を送出する)"""
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+            while self.pending or self.writing:
+                self.condition.wait()
+            self.flush_requested = False
+            errors = list(self.errors.values())
+            self.errors.clear()
+        if errors:
+            raise errors[0]
+
+# --- 変更ジャーナル ---
+# ジャーナルは1行1レコードのJSON Lines形式で、各レコードは何度適用しても結果が同じ (冪等) になるようにする。
+# 辞書ファイルの保存後・ジャーナル削除前に終了しても、次回起動時の再適用で同じ状態に戻る。
+
+# ジャーナルへの追記と、保存スレッドによる統合済み部分の削除を排他する
+journal_lock = threading.Lock()
+
+def get_journal_path(data_file):
+    """辞書ファイルに対応するジャーナルファイルのパスを返す関数"""
+    return data_file + '.journal'
+
+def make_upsert_tag_record(category_id, tag_en, tag_ja):
+    """タグの追加・日本語説明の更新を表すジャーナルレコードを作成する関数"""
+    return {"op": "upsert_tag", "category_id": category_id, "en": tag_en, "ja": tag_ja}
+
+def make_add_category_record(category):
+    """カテゴリの追加を表すジャーナルレコードを作成する関数"""
+    return {"op": "add_category", "id": category['id'], "name": category['name'], "parent_id": category.get('parent_id')}
+
+def make_delete_tag_record(category_id, tag_en):
+    """カテゴリからのタグの削除を表すジャーナルレコードを作成する関数"""
+    return {"op": "delete_tag", "category_id": category_id, "en": tag_en}
+
+def make_delete_category_record(category_id):
+    """カテゴリの削除を表すジャーナルレコードを作成する関数"""
+    return {"op": "delete_category", "id": category_id}
+
+def apply_journal_record(dictionary, record):
+    """ジャーナルの1レコードを辞書データに適用する関数"""
+    categories = dictionary.setdefault('categories', [])
+    op = record.get('op')
+    if op == 'upsert_tag':
+        category = find_category_by_id(record['category_id'], categories)
+        if category is None:
+            return
+        tags = category.setdefault('tags', [])
+        tag_en_lower = record['en'].lower()
+        existing_tag = next((t for t in tags if t['en'].lower() == tag_en_lower), None)
+        if existing_tag:
+            existing_tag['ja'] = record['ja']
+        else:
+            tags.append({"en": record['en'], "ja": record['ja']})
+    elif op == 'delete_tag':
+        category = find_category_by_id(record['category_id'], categories)
+        if category is None:
+            return
+        tag_en_lower = record['en'].lower()
+        category['tags'] = [t for t in category.get('tags', []) if t['en'].lower() != tag_en_lower]
+    elif op == 'add_category':
+        if find_category_by_id(record['id'], categories) is None:
+            categories.append({"id": record['id'], "name": record['name'], "parent_id": record.get('parent_id'), "tags": []})
+    elif op == 'delete_category':
+        dictionary['categories'] = [cat for cat in categories if cat['id'] != record['id']]
+
+def replay_journal(dictionary, journal_path, repair=False):
+    """ジャーナルを辞書データに再適用し、適用したレコード数を返す関数"""
+    if not os.path.exists(journal_path):
+        return 0
+    applied_count = 0
+    valid_size = 0
+    with open(journal_path, 'rb') as f:
+        for line in f:
+            # 改行で終わらない・解析できない行は書き込み途中で終了したレコードなので、以降は無視する
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            apply_journal_record(dictionary, record)
+            applied_count += 1
+            valid_size += len(line)
+    # 途切れたレコードの後ろに追記すると以降のレコードも読めなくなるため、有効な範囲まで切り詰める
+    if repair and valid_size < os.path.getsize(journal_path):
+        with open(journal_path, 'r+b') as f:
+            f.truncate(valid_size)
+    return applied_count
+
+def append_journal_records(journal_path, records):
+    """変更レコードをジャーナルに追記し、ディスクに同期する関数"""
+    with journal_lock:
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+def trim_journal(journal_path, journal_offset):
+    """辞書ファイルに統合済みのジャーナルの先頭 journal_offset バイトを削除し、削除したバイト数を返す関数
+
+    追記と排他するため、呼び出し元で journal_lock を取得しておく。
+    """
+    if journal_offset <= 0 or not os.path.exists(journal_path):
+        return 0
+    journal_size = os.path.getsize(journal_path)
+    if journal_size <= journal_offset:
+        os.remove(journal_path)
+        return journal_size
+    # スナップショット作成後に追記されたレコードだけを残す
+    with open(journal_path, 'rb') as f:
+        f.seek(journal_offset)
+        remaining = f.read()
+    temp_path = journal_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(remaining)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, journal_path)
+    return journal_offset
+
+def commit_changes():
+    """記録された変更だけを保存先に反映する関数 (変更がなければ何もせず False を返す)"""
+    changes = app_state['changes']
+    if not changes.records:
+        return False
+    get_dictionary_storage().apply_changes(app_state['dictionary'], changes.take())
+    return True
+
+# 辞書ファイルの保存スレッド
+dictionary_writer = DictionaryWriter()
+
+# --- 辞書の保存先 (ストレージ) ---
+# 保存先は load / save_all / apply_changes / flush / close を持つ。apply_changes には
+# 変更ジャーナルと同じ形式のレコードを渡し、各保存先が差分だけを書き込む。
+
+class JsonDictionaryStorage:
+    """辞書JSONファイルと変更ジャーナルに辞書を保存するストレージ"""
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+        self.journal_path = get_journal_path(data_file)
+        self.journal_records = 0  # 前回の統合の依頼以降にジャーナルへ追記したレコード数
+        # 読み込み以降にジャーナルの先頭から削除したバイト数 (journal_lock で排他する)。
+        # スナップショットには「読み込み時のジャーナルの先頭から数えた位置」を記録し、削除時に現在のファイル上の位置に直す。
+        # 書き込み待ちの間に前の依頼がジャーナルを切り詰めても、後の依頼が削除する範囲はずれない
+        self.journal_trimmed = 0
+        # 辞書ファイルの書き込みの依頼番号と、書き込みが完了した依頼番号 (保存スレッドからも更新するため lock で排他する)。
+        # 書き込みに失敗した場合は完了番号が進まないため、flush / close で最後の依頼を書き込み直す
+        self.lock = threading.Lock()
+        self.requested_snapshot = 0
+        self.written_snapshot = 0
+        self.last_snapshot_job = None
+
+    def load(self, repair_journal=True):
+        """辞書ファイルを読み込み、前回のコンパクション以降の変更をジャーナルから再適用する"""
+        if os.path.exists(self.data_file):
+            dictionary = read_dictionary_with_snapshot(self.data_file)
+        else:
+            dictionary = {"categories": []}
+        with journal_lock:
+            self.journal_records = replay_journal(dictionary, self.journal_path, repair=repair_journal)
+            self.journal_trimmed = 0
+        return dictionary
+
+    def save_all(self, dictionary):
+        """辞書データのスナップショットを作成し、保存スレッドに書き込みを依頼する"""
+        with journal_lock:
+            # ここまでに追記されたジャーナルはスナップショットに含まれるため、書き込み後に削除できる
+            journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+            journal_offset = self.journal_trimmed + journal_size
+        with self.lock:
+            self.requested_snapshot += 1
+            job = functools.partial(self.write_snapshot, snapshot_dictionary(dictionary), journal_offset, self.requested_snapshot)
+            self.last_snapshot_job = job
+        dictionary_writer.submit(self.data_file, job)
+        # 追記済みのジャーナルは書き込みが完了するまで削除されないため、統合の判定は依頼した時点から数え直す
+        self.journal_records = 0
+
+    def write_snapshot(self, snapshot, journal_offset, request_number):
+        """スナップショットを辞書ファイルに書き込む (保存スレッドで実行し、成功した場合だけ完了番号を進める)"""
+        write_dictionary_snapshot(self.data_file, snapshot)
+        with journal_lock:
+            # 先に書き込んだ依頼が削除した分を差し引き、このスナップショットに含まれるレコードだけを削除する
+            self.journal_trimmed += trim_journal(self.journal_path, journal_offset - self.journal_trimmed)
+        with self.lock:
+            self.written_snapshot = max(self.written_snapshot, request_number)
+
+    def apply_changes(self, dictionary, records):
+        """変更レコードをジャーナルに追記し、一定件数ごとに辞書ファイルへ統合する"""
+        if not USE_JOURNAL or self.journal_records + len(records) >= JOURNAL_COMPACT_THRESHOLD:
+            # 追記してもすぐに統合することになる大きな変更は、ジャーナルを経由せず辞書ファイルに書き込む
+            self.save_all(dictionary)
+            return
+        append_journal_records(self.journal_path, records)
+        self.journal_records += len(records)
+
+    def flush(self):
+        """保存待ちの書き込みを完了させる (辞書ファイルの書き込みに失敗していた場合は最後の依頼を書き込み直す)"""
+        with self.lock:
+            retry_job = self.last_snapshot_job if self.written_snapshot < self.requested_snapshot else None
+        if retry_job is not None:
+            # 書き込み待ちの同じ依頼があれば置き換えるだけになる
+            dictionary_writer.submit(self.data_file, retry_job)
+        dictionary_writer.flush()
+
+    def close(self, dictionary):
+        """未統合のジャーナルを辞書ファイルへ統合し、書き込みの完了を待つ"""
+        if self.journal_records > 0:
+            self.save_all(dictionary)
+        self.flush()
+
+class SqliteDictionaryStorage:
+    """SQLiteデータベースに辞書を保存するストレージ (変更はタグ単位のSQLで反映する)"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            parent_id TEXT,
+            position INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_categories_parent_id ON categories (parent_id);
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY,
+            category_id TEXT NOT NULL,
+            en TEXT NOT NULL,
+            en_lower TEXT NOT NULL,
+            ja TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_tags_category_id ON tags (category_id, en_lower);
+        CREATE INDEX IF NOT EXISTS idx_tags_en_lower ON tags (en_lower);
+    """
+
+    def __init__(self, db_path, import_from=None):
+        self.db_path = db_path
+        self.import_from = import_from  # データベースが空の場合に取り込む辞書JSONファイル
+        self.connection = None
+
+    def connect(self):
+        """データベースに接続し、テーブルがなければ作成する"""
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.db_path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(self.SCHEMA)
+        return self.connection
+
+    def load(self):
+        """データベースから辞書データを読み込む"""
+        connection = self.connect()
+        is_empty = connection.execute("SELECT NOT EXISTS (SELECT 1 FROM categories)").fetchone()[0]
+        if is_empty and self.import_from and os.path.exists(self.import_from):
+            # 初回起動時は既存の辞書JSONファイルを取り込む
+            dictionary = JsonDictionaryStorage(self.import_from).load(repair_journal=False)
+            self.save_all(dictionary)
+            return dictionary
+
+        categories = []
+        categories_by_id = {}
+        for category_id, name, parent_id in connection.execute("SELECT id, name, parent_id FROM categories ORDER BY position"):
+            category = {"id": category_id, "name": name, "parent_id": parent_id, "tags": []}
+            categories.append(category)
+            categories_by_id[category_id] = category
+        for category_id, tag_en, tag_ja in connection.execute("SELECT category_id, en, ja FROM tags ORDER BY id"):
+            category = categories_by_id.get(category_id)
+            if category is not None:
+                category['tags'].append({"en": tag_en, "ja": tag_ja})
+        return {"categories": categories}
+
+    def save_all(self, dictionary):
+        """データベースの内容を辞書データ全体で置き換える"""
+        connection = self.connect()
+        categories = dictionary.get('categories', [])
+        with connection:
+            connection.execute("DELETE FROM tags")
+            connection.execute("DELETE FROM categories")
+            connection.executemany(
+                "INSERT INTO categories (id, name, parent_id, position) VALUES (?, ?, ?, ?)",
+                ((cat['id'], cat['name'], cat.get('parent_id'), position) for position, cat in enumerate(categories))
+            )
+            connection.executemany(
+                "INSERT INTO tags (category_id, en, en_lower, ja) VALUES (?, ?, ?, ?)",
+                ((cat['id'], tag['en'], tag['en'].lower(), tag.get('ja')) for cat in categories for tag in cat.get('tags', []))
+            )
+
+    def apply_changes(self, dictionary, records):
+        """変更レコードを1つのトランザクションでSQLとして反映する"""
+        connection = self.connect()
+        with connection:
+            for record in records:
+                op = record.get('op')
+                if op == 'upsert_tag':
+                    # ジャーナルの再適用と同じく、カテゴリ内で最初に一致したタグだけを更新する
+                    cursor = connection.execute(
+                        "UPDATE tags SET ja = ? WHERE id = "
+                        "(SELECT MIN(id) FROM tags WHERE category_id = ? AND en_lower = ?)",
+                        (record['ja'], record['category_id'], record['en'].lower())
+                    )
+                    if cursor.rowcount == 0:
+                        connection.execute(
+                            "INSERT INTO tags (category_id, en, en_lower, ja) "
+                            "SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM categories WHERE id = ?)",
+                            (record['category_id'], record['en'], record['en'].lower(), record['ja'], record['category_id'])
+                        )
+                elif op == 'delete_tag':
+                    connection.execute("DELETE FROM tags WHERE category_id = ? AND en_lower = ?",
+                                       (record['category_id'], record['en'].lower()))
+                elif op == 'add_category':
+                    connection.execute(
+                        "INSERT OR IGNORE INTO categories (id, name, parent_id, position) "
+                        "VALUES (?, ?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM categories))",
+                        (record['id'], record['name'], record.get('parent_id'))
+                    )
+                elif op == 'delete_category':
+                    connection.execute("DELETE FROM tags WHERE category_id = ?", (record['id'],))
+                    connection.execute("DELETE FROM categories WHERE id = ?", (record['id'],))
+
+    def flush(self):
+        """変更は反映時にコミット済みのため何もしない"""
+
+    def close(self, dictionary):
+        """データベースへの接続を閉じる"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+class ShardedDictionaryStorage:
+    """トップレベルカテゴリごとのJSONファイル (シャード) とマニフェストに辞書を保存するストレージ
+
+    保存時は変更のあったシャードだけを書き直す。読み込み時は全てのシャードを読むため、起動時の読み込み量は
+    辞書JSONファイルと変わらない (辞書管理タブのタグ一覧・カテゴリ階層・検索インデックスが起動直後に全タグを使うため、
+    カテゴリごとの遅延読み込みは行わない)。マニフェストのシャードごとのタグ数は参照用で、読み込みには使わない。
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+    MANIFEST_FORMAT = 1
+
+    def __init__(self, directory, import_from=None):
+        self.directory = directory
+        self.import_from = import_from  # シャードがない場合に取り込む辞書JSONファイル
+        self.written_hashes = {}        # シャード名 (マニフェストは None) -> 最後に読み書きした内容のハッシュ
+        self.queued_hashes = {}         # シャード名 -> 保存スレッドに書き込みを依頼して完了していない内容のハッシュ
+        self.failed_shards = set()      # 書き込みに失敗し、次の保存で書き直すシャード名
+        self.hash_lock = threading.Lock()  # 上の3つは保存スレッドからも更新するため排他する
+        self.shard_names = {}           # カテゴリID -> 最後に読み書きした時点のシャード名
+
+    def get_shard_path(self, shard_name):
+        """シャード名に対応するファイルのパスを返す"""
+        return os.path.join(self.directory, shard_name + '.json')
+
+    @staticmethod
+    def serialize(data):
+        """シャード・マニフェストをファイルに書き込むバイト列に変換する"""
+        return json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+
+    @staticmethod
+    def get_shard_names(categories):
+        """カテゴリID -> シャード名 (トップレベルカテゴリのIDをファイル名に使える形にしたもの) の辞書を返す"""
+        categories_by_id = {cat['id']: cat for cat in categories}
+        shard_names = {}
+        for category in categories:
+            root = category
+            visited = set()
+            while root.get('parent_id') is not None and root['id'] not in visited:
+                visited.add(root['id'])
+                parent = categories_by_id.get(root['parent_id'])
+                if parent is None:
+                    break
+                root = parent
+            shard_names[category['id']] = re.sub(r'[^\w.-]', '_', str(root['id']))
+        return shard_names
+
+    def build_shards(self, categories, shard_names, target_shards=None):
+        """シャード名 -> シャードの内容 の辞書を作成する (target_shards を指定した場合はそのシャードだけ)"""
+        shards = {}
+        for category in categories:
+            shard_name = shard_names[category['id']]
+            if target_shards is not None and shard_name not in target_shards:
+                continue
+            shard = shards.setdefault(shard_name, {"categories": []})
+            shard['categories'].append({"id": category['id'], "tags": [tag_to_json(tag) for tag in category.get('tags', [])]})
+        return shards
+
+    def build_manifest(self, categories, shard_names):
+        """カテゴリの階層とシャードごとのタグ数を持つマニフェストを作成する"""
+        shard_tag_counts = {}
+        manifest_categories = []
+        for category in categories:
+            shard_name = shard_names[category['id']]
+            shard_tag_counts[shard_name] = shard_tag_counts.get(shard_name, 0) + len(category.get('tags', []))
+            manifest_categories.append({"id": category['id'], "name": category['name'],
+                                        "parent_id": category.get('parent_id'), "shard": shard_name})
+        return {
+            "format": self.MANIFEST_FORMAT,
+            "categories": manifest_categories,
+            "shards": {name: {"tag_count": count} for name, count in shard_tag_counts.items()}
+        }
+
+    def load(self):
+        """マニフェストと全てのシャードから辞書データを読み込む"""
+        manifest_path = os.path.join(self.directory, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            dictionary = {"categories": []}
+            if self.import_from and os.path.exists(self.import_from):
+                # 初回起動時は既存の辞書JSONファイルを分割して保存する
+                dictionary = JsonDictionaryStorage(self.import_from).load(repair_journal=False)
+                self.save_all(dictionary)
+            return dictionary
+
+        with open(manifest_path, 'rb') as f:
+            manifest_content = f.read()
+        manifest = json.loads(manifest_content)
+        self.written_hashes = {None: hashlib.blake2b(manifest_content, digest_size=20).digest()}
+        categories = []
+        categories_by_id = {}
+        for entry in manifest.get('categories', []):
+            category = {"id": entry['id'], "name": entry['name'], "parent_id": entry.get('parent_id'), "tags": []}
+            categories.append(category)
+            categories_by_id[entry['id']] = category
+            self.shard_names[entry['id']] = entry['shard']
+        for shard_name in manifest.get('shards', {}):
+            shard_path = self.get_shard_path(shard_name)
+            if not os.path.exists(shard_path):
+                continue
+            with open(shard_path, 'rb') as f:
+                shard_content = f.read()
+            self.written_hashes[shard_name] = hashlib.blake2b(shard_content, digest_size=20).digest()
+            for entry in json.loads(shard_content).get('categories', []):
+                category = categories_by_id.get(entry['id'])
+                if category is None:
+                    continue
+                category['tags'] = entry.get('tags', [])
+                for tag in category['tags']:
+                    if tag.get('ja') is not None:
+                        tag['ja'] = tag['ja'].strip()
+        return {"categories": categories}
+
+    def write_changed(self, dictionary, target_shards=None, shard_names=None):
+        """内容が変わったシャードとマニフェストだけを保存スレッドに書き込ませる"""
+        categories = dictionary.get('categories', [])
+        if shard_names is None:
+            shard_names = self.get_shard_names(categories)
+        self.shard_names = shard_names
+        contents = {name: self.serialize(shard) for name, shard in self.build_shards(categories, shard_names, target_shards).items()}
+        contents[None] = self.serialize(self.build_manifest(categories, shard_names))
+        live_shards = set(shard_names.values())
+        os.makedirs(self.directory, exist_ok=True)
+        # シャードを先に書き込み、最後にマニフェストを書き込む
+        for shard_name, content in sorted(contents.items(), key=lambda item: item[0] is None):
+            content_hash = hashlib.blake2b(content, digest_size=20).digest()
+            with self.hash_lock:
+                # 書き込み待ちの内容があればそれと、なければ書き込み済みの内容と比べる
+                if self.queued_hashes.get(shard_name, self.written_hashes.get(shard_name)) == content_hash:
+                    continue
+                self.queued_hashes[shard_name] = content_hash
+            path = os.path.join(self.directory, self.MANIFEST_FILE) if shard_name is None else self.get_shard_path(shard_name)
+            dictionary_writer.submit(path, functools.partial(self.write_shard_file, shard_name, path, content, content_hash))
+        # カテゴリの削除で使われなくなったシャードを削除する
+        with self.hash_lock:
+            unused_shards = [name for name in set(self.written_hashes) | set(self.queued_hashes)
+                             if name is not None and name not in live_shards]
+            for shard_name in unused_shards:
+                self.written_hashes.pop(shard_name, None)
+                self.queued_hashes.pop(shard_name, None)
+                self.failed_shards.discard(shard_name)
+        for shard_name in unused_shards:
+            path = self.get_shard_path(shard_name)
+            dictionary_writer.submit(path, functools.partial(remove_file_if_exists, path))
+
+    def write_shard_file(self, shard_name, path, content, content_hash):
+        """シャード・マニフェストを書き込む (保存スレッドで実行し、成功した場合だけ書き込み済みのハッシュを更新する)"""
+        try:
+            write_file_atomically(path, content)
+        except Exception:
+            with self.hash_lock:
+                # ファイルは書き込み前の内容のままなので、次の保存で書き直す
+                if self.queued_hashes.get(shard_name) == content_hash:
+                    del self.queued_hashes[shard_name]
+                self.written_hashes.pop(shard_name, None)
+                self.failed_shards.add(shard_name)
+            raise
+        with self.hash_lock:
+            self.written_hashes[shard_name] = content_hash
+            if self.queued_hashes.get(shard_name) == content_hash:
+                del self.queued_hashes[shard_name]
+            self.failed_shards.discard(shard_name)
+
+    def save_all(self, dictionary):
+        """辞書データ全体を保存する (内容が変わったシャードだけを書き直す)"""
+        self.write_changed(dictionary)
+
+    def apply_changes(self, dictionary, records):
+        """変更レコードが対象とするカテゴリのシャードとマニフェストだけを書き直す
+
+        削除されたカテゴリは変更後の階層にないため、前回の書き込み時点のシャード名からも対象のシャードを求める。
+        親の削除などでシャードが変わったカテゴリは、移動元と移動先の両方のシャードを書き直す。
+        """
+        shard_names = self.get_shard_names(dictionary.get('categories', []))
+        changed_ids = {record.get('category_id', record.get('id')) for record in records}
+        changed_ids.update(category_id for category_id, shard_name in shard_names.items()
+                           if self.shard_names.get(category_id) != shard_name)
+        target_shards = {names[category_id] for names in (self.shard_names, shard_names)
+                         for category_id in changed_ids if category_id in names}
+        with self.hash_lock:
+            # 以前に書き込みに失敗したシャードも書き直す
+            target_shards |= self.failed_shards
+        self.write_changed(dictionary, target_shards, shard_names)
+
+    def flush(self):
+        """保存待ちの書き込みを完了させる"""
+        dictionary_writer.flush()
+
+    def close(self, dictionary):
+        """書き込みに失敗していたシャードを書き直し、書き込みの完了を待つ"""
+        with self.hash_lock:
+            failed_shards = set(self.failed_shards)
+        if failed_shards:
+            self.write_changed(dictionary, failed_shards)
+        self.flush()
+
+def open_dictionary_storage(path):
+    """パスに応じた辞書の保存先を作成する関数 (.sqlite3 / .sqlite / .db はSQLite、ディレクトリはシャード)"""
+    if os.path.splitext(path)[1].lower() in ('.sqlite3', '.sqlite', '.db'):
+        return SqliteDictionaryStorage(path)
+    if os.path.isdir(path):
+        return ShardedDictionaryStorage(path)
+    return JsonDictionaryStorage(path)
+
+def get_dictionary_storage():
+    """STORAGE_BACKEND の設定に応じたアプリの辞書の保存先を返す関数"""
+    if app_state['storage'] is None:
+        if STORAGE_BACKEND == 'sqlite':
+            app_state['storage'] = SqliteDictionaryStorage(SQLITE_FILE, import_from=DATA_FILE)
+        elif STORAGE_BACKEND == 'sharded':
+            app_state['storage'] = ShardedDictionaryStorage(SHARD_DIRECTORY, import_from=DATA_FILE)
+        else:
+            app_state['storage'] = JsonDictionaryStorage(DATA_FILE)
+    return app_state['storage']
+
+def get_dictionary_path():
+    """STORAGE_BACKEND の設定に応じたアプリの辞書の保存先のパスを返す関数"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SQLITE_FILE
+    if STORAGE_BACKEND == 'sharded':
+        return SHARD_DIRECTORY
+    return DATA_FILE
+
+# --- 読み取り専用の辞書イメージ (mmap) ---
+# 辞書を文字列プール・固定長レコードの配列・ハッシュ表からなる1つのファイルに書き出す。
+# 各プロセスは mmap で開くだけで、辞書を展開せずにページキャッシュ上の同じ内容を参照できる。
+#
+#   ヘッダー | カテゴリレコード | タグレコード | カテゴリIDのハッシュ表 | 英語タグ名(小文字)のハッシュ表 | 文字列プール
+#
+# 文字列は (プール内のオフセット, バイト長) で参照する。タグはカテゴリの順に連続して並ぶため、
+# カテゴリのタグは (先頭のタグ番号, タグ数) の範囲で表せる。ハッシュ表は開番地法で、
+# スロットにはレコード番号 + 1 (0 は空き) を入れる。
+
+DICTIONARY_IMAGE_MAGIC = b'TAGDIMG\0'
+DICTIONARY_IMAGE_VERSION = 1
+# マジック, 版数, カテゴリ数, タグ数, カテゴリ表のスロット数, タグ表のスロット数,
+# 各領域の開始位置 (カテゴリレコード, タグレコード, カテゴリ表, タグ表, 文字列プール)
+DICTIONARY_IMAGE_HEADER = struct.Struct('<8sIIIII5Q')
+# ID, 名前, パス (各 オフセット・長さ), 親カテゴリ番号 (-1 はなし), 先頭のタグ番号, タグ数
+DICTIONARY_IMAGE_CATEGORY = struct.Struct('<IIIIIIiII')
+# 英語タグ名, 英語タグ名(小文字), 日本語説明 (各 オフセット・長さ), カテゴリ番号
+DICTIONARY_IMAGE_TAG = struct.Struct('<IIIIIII')
+DICTIONARY_IMAGE_SLOT = struct.Struct('<I')
+
+def dictionary_image_hash(key_bytes):
+    """辞書イメージのハッシュ表で使うハッシュ値 (プロセスやPythonの版によらず同じ値になる)"""
+    return zlib.crc32(key_bytes)
+
+def build_dictionary_image_table(keys):
+    """キーのバイト列のリストから開番地法のハッシュ表 (スロットの配列) を作る関数 (同じキーは先のものを優先)"""
+    slot_count = 1
+    while slot_count < len(keys) * 2:
+        slot_count *= 2
+    mask = slot_count - 1
+    slots = [0] * slot_count
+    seen = set()
+    for record_number, key in enumerate(keys):
+        if key in seen:
+            continue
+        seen.add(key)
+        slot = dictionary_image_hash(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = record_number + 1
+    return slots
+
+def build_dictionary_image(dictionary):
+    """辞書から辞書イメージのバイト列を作る関数"""
+    categories = dictionary.get('categories', [])
+    id_to_path = build_category_path_maps(categories)['id_to_path']
+    category_numbers = {}
+    for category_number, category in enumerate(categories):
+        category_numbers.setdefault(category['id'], category_number)
+
+    pool = bytearray()
+    pooled = {}
+
+    def add_string(text):
+        # 同じ文字列はプールに1回だけ格納する
+        location = pooled.get(text)
+        if location is None:
+            encoded = text.encode('utf-8')
+            location = (len(pool), len(encoded))
+            pool.extend(encoded)
+            pooled[text] = location
+        return location
+
+    category_records = bytearray()
+    tag_records = bytearray()
+    category_keys = []
+    tag_keys = []
+    tag_count = 0
+    for category_number, category in enumerate(categories):
+        tags = category.get('tags', [])
+        category_records += DICTIONARY_IMAGE_CATEGORY.pack(
+            *add_string(category['id']), *add_string(category['name']),
+            *add_string(id_to_path.get(category['id'], '')),
+            category_numbers.get(category.get('parent_id'), -1), tag_count, len(tags))
+        category_keys.append(category['id'].encode('utf-8'))
+        for tag in tags:
+            tag_en_lower = tag['en'].lower()
+            tag_records += DICTIONARY_IMAGE_TAG.pack(
+                *add_string(tag['en']), *add_string(tag_en_lower), *add_string(tag.get('ja') or ''),
+                category_number)
+            tag_keys.append(tag_en_lower.encode('utf-8'))
+        tag_count += len(tags)
+
+    category_slots = build_dictionary_image_table(category_keys)
+    tag_slots = build_dictionary_image_table(tag_keys)
+    category_records_offset = DICTIONARY_IMAGE_HEADER.size
+    tag_records_offset = category_records_offset + len(category_records)
+    category_table_offset = tag_records_offset + len(tag_records)
+    tag_table_offset = category_table_offset + len(category_slots) * DICTIONARY_IMAGE_SLOT.size
+    pool_offset = tag_table_offset + len(tag_slots) * DICTIONARY_IMAGE_SLOT.size
+    header = DICTIONARY_IMAGE_HEADER.pack(
+        DICTIONARY_IMAGE_MAGIC, DICTIONARY_IMAGE_VERSION, len(categories), tag_count,
+        len(category_slots), len(tag_slots),
+        category_records_offset, tag_records_offset, category_table_offset, tag_table_offset, pool_offset)
+    return b''.join((
+        header, category_records, tag_records,
+        struct.pack(f'<{len(category_slots)}I', *category_slots),
+        struct.pack(f'<{len(tag_slots)}I', *tag_slots),
+        pool))
+
+def write_dictionary_image(dictionary, image_path):
+    """辞書を辞書イメージとしてファイルに書き出す関数
+
+    一時ファイルから置き換えるため、書き出し前のイメージを開いているプロセスは古い内容を参照し続ける。
+    """
+    write_file_atomically(image_path, build_dictionary_image(dictionary))
+
+class DictionaryImage:
+    """辞書イメージを mmap で開き、展開せずに検索するクラス (読み取り専用)"""
+
+    def __init__(self, image_path):
+        with open(image_path, 'rb') as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mapping)
+        try:
+            if len(self.buffer) < DICTIONARY_IMAGE_HEADER.size:
+                raise ValueError(f"辞書イメージではありません: {image_path}")
+            (magic, version, self.category_count, self.tag_count, self.category_slot_count, self.tag_slot_count,
+             self.category_records_offset, self.tag_records_offset, self.category_table_offset,
+             self.tag_table_offset, self.pool_offset) = DICTIONARY_IMAGE_HEADER.unpack_from(self.buffer)
+            if magic != DICTIONARY_IMAGE_MAGIC:
+                raise ValueError(f"辞書イメージではありません: {image_path}")
+            if version != DICTIONARY_IMAGE_VERSION:
+                raise ValueError(f"対応していない辞書イメージの版数です ({version}): {image_path}")
+        except ValueError:
+            self.close()
+            raise
+
+    def close(self):
+        """mmap を閉じる"""
+        self.buffer.release()
+        self.mapping.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_string(self, offset, length):
+        """文字列プールから文字列を取り出す"""
+        start = self.pool_offset + offset
+        return str(self.buffer[start:start + length], 'utf-8')
+
+    def string_equals(self, offset, length, key_bytes):
+        """文字列プールの文字列がキーのバイト列と等しいかを、文字列を作らずに比べる"""
+        start = self.pool_offset + offset
+        return length == len(key_bytes) and self.buffer[start:start + length] == key_bytes
+
+    def category_record(self, category_number):
+        return DICTIONARY_IMAGE_CATEGORY.unpack_from(self.buffer, self.category_records_offset + category_number * DICTIONARY_IMAGE_CATEGORY.size)
+
+    def tag_record(self, tag_number):
+        return DICTIONARY_IMAGE_TAG.unpack_from(self.buffer, self.tag_records_offset + tag_number * DICTIONARY_IMAGE_TAG.size)
+
+    def lookup(self, table_offset, slot_count, key_bytes, key_location):
+        """ハッシュ表からキーに一致するレコード番号を返す (見つからなければ None)"""
+        if not slot_count:
+            return None
+        mask = slot_count - 1
+        slot = dictionary_image_hash(key_bytes) & mask
+        while True:
+            (entry,) = DICTIONARY_IMAGE_SLOT.unpack_from(self.buffer, table_offset + slot * DICTIONARY_IMAGE_SLOT.size)
+            if not entry:
+                return None
+            if self.string_equals(*key_location(entry - 1), key_bytes):
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def find_category_number(self, category_id):
+        """カテゴリIDからカテゴリ番号を返す (見つからなければ None)"""
+        return self.lookup(self.category_table_offset, self.category_slot_count, category_id.encode('utf-8'),
+                           lambda number: self.category_record(number)[0:2])
+
+    def find_tag(self, tag_en):
+        """英語タグ名 (大文字小文字を区別しない) から (カテゴリID, 英語タグ名, 日本語説明) を返す
+
+        同じ英語タグ名が複数ある場合は辞書順で最初のタグを返す。見つからなければ None を返す。
+        """
+        tag_number = self.lookup(self.tag_table_offset, self.tag_slot_count, tag_en.lower().encode('utf-8'),
+                                 lambda number: self.tag_record(number)[2:4])
+        if tag_number is None:
+            return None
+        en_offset, en_length, _, _, ja_offset, ja_length, category_number = self.tag_record(tag_number)
+        category_id = self.read_string(*self.category_record(category_number)[0:2])
+        return category_id, self.read_string(en_offset, en_length), self.read_string(ja_offset, ja_length)
+
+    def get_category_tags(self, category_id):
+        """カテゴリのタグを [(英語タグ名, 日本語説明), ...] で返す"""
+        category_number = self.find_category_number(category_id)
+        if category_number is None:
+            return []
+        *_, first_tag, tag_count = self.category_record(category_number)
+        tags = []
+        for tag_number in range(first_tag, first_tag + tag_count):
+            en_offset, en_length, _, _, ja_offset, ja_length, _ = self.tag_record(tag_number)
+            tags.append((self.read_string(en_offset, en_length), self.read_string(ja_offset, ja_length)))
+        return tags
+
+    def get_category_path(self, category_id):
+        """カテゴリIDからカテゴリパスを返す (見つからなければ空文字)"""
+        category_number = self.find_category_number(category_id)
+        if category_number is None:
+            return ""
+        return self.read_string(*self.category_record(category_number)[4:6])
+
+
+def bump_dictionary_version():
+    """辞書の版数を進め、古い版で計算した分類ヒントを無効にする関数"""
+    app_state['dictionary_version'] += 1
+
+def split_tag_words(tag_en_lower):
+    """英語タグ名を単語に分割する関数 (空白・アンダースコア・ハイフン区切り)"""
+    return re.split(r'[ _-]', tag_en_lower)
+
+class AhoCorasickMatcher:
+    """複数の辞書タグを入力文字列の1回の走査で検出するAho-Corasickオートマトン"""
+
+    def __init__(self):
+        self.goto = [{}]          # 状態 -> {文字: 次の状態}
+        self.fail = [0]           # 状態 -> 失敗遷移先
+        self.output_link = [0]    # 状態 -> 失敗遷移をたどって最初に見つかる終端状態
+        self.terminal = {}        # 終端状態 -> パターン
+        self.needs_build = False  # パターン追加後は検索前に失敗遷移を再計算する
+
+    def add(self, pattern):
+        """パターンをトライに追加する (失敗遷移は次回の検索時に再計算)"""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output_link.append(0)
+                self.goto[state][char] = next_state
+            state = next_state
+        if state not in self.terminal:
+            self.terminal[state] = pattern
+            self.needs_build = True
+
+    def build(self):
+        """幅優先探索で失敗遷移と出力リンクを計算する"""
+        goto, fail, output_link, terminal = self.goto, self.fail, self.output_link, self.terminal
+        queue = []
+        for child in goto[0].values():
+            fail[child] = 0
+            output_link[child] = 0
+            queue.append(child)
+        for state in queue:
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                child_fail = goto[fallback].get(char, 0)
+                fail[child] = child_fail
+                output_link[child] = child_fail if child_fail in terminal else output_link[child_fail]
+                queue.append(child)
+        self.needs_build = False
+
+    def find_all(self, text):
+        """text に含まれる全パターンを返す (計算量は入力長と一致数に比例)"""
+        if self.needs_build:
+            self.build()
+        goto, fail, output_link, terminal = self.goto, self.fail, self.output_link, self.terminal
+        found = []
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            match_state = state if state in terminal else output_link[state]
+            while match_state:
+                found.append(terminal[match_state])
+                match_state = output_link[match_state]
+        return found
+
+class NGramSubstringIndex:
+    """トライグラムの転置リストで「クエリを含む文字列」を検索する部分文字列インデックス"""
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        self.key_counts = {}  # 登録文字列 -> 参照数
+        self.grams = {}       # トライグラム -> 登録文字列の集合
+
+    def _grams_of(self, text):
+        size = self.GRAM_SIZE
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def add(self, key):
+        """文字列を登録する (同じ文字列は参照数で管理)"""
+        if key in self.key_counts:
+            self.key_counts[key] += 1
+            return
+        self.key_counts[key] = 1
+        for gram in self._grams_of(key):
+            self.grams.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        """文字列の登録を1件解除する"""
+        count = self.key_counts.get(key)
+        if count is None:
+            return
+        if count > 1:
+            self.key_counts[key] = count - 1
+            return
+        del self.key_counts[key]
+        for gram in self._grams_of(key):
+            keys = self.grams.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.grams[gram]
+
+    def search(self, query):
+        """query を部分文字列として含む登録文字列の集合を返す"""
+        if len(query) < self.GRAM_SIZE:
+            # 短いクエリはほぼ全件がヒットするため、登録文字列を直接走査する
+            return {key for key in self.key_counts if query in key}
+        posting_sets = []
+        for gram in self._grams_of(query):
+            keys = self.grams.get(gram)
+            if not keys:
+                return set()
+            posting_sets.append(keys)
+        # 最も短い転置リストから候補を絞り込み、最後に実際の包含を確認する
+        posting_sets.sort(key=len)
+        candidates = set(posting_sets[0])
+        for keys in posting_sets[1:]:
+            candidates &= keys
+            if not candidates:
+                return candidates
+        return {key for key in candidates if query in key}
+
+class TrigramFuzzyIndex:
+    """トライグラム類似度で綴り誤り・表記ゆれのある近いタグを検索するインデックス"""
+
+    # 候補を漏らさない最小限のトライグラムに加えて調べるトライグラム数 (候補の絞り込み用)
+    EXTRA_PROBE_GRAMS = 2
+
+    def __init__(self):
+        self.key_grams = {}    # 正規化した文字列 -> トライグラムの集合
+        self.key_sources = {}  # 正規化した文字列 -> 登録した元の文字列のリスト
+        self.source_counts = Counter()  # 元の文字列 -> 参照数
+        self.grams = {}        # トライグラム -> 正規化した文字列のリスト
+
+    @staticmethod
+    def normalize(text):
+        """区切り文字の違い ("t-shirt" / "t shirt" / "tshirt") を吸収するための正規化"""
+        return re.sub(r'[\s_-]+', '', text.lower())
+
+    @staticmethod
+    def trigrams(normalized):
+        padded = f"  {normalized} "
+        return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    def add(self, text):
+        """文字列を登録する"""
+        normalized = self.normalize(text)
+        if not normalized:
+            return
+        self.source_counts[text] += 1
+        sources = self.key_sources.get(normalized)
+        if sources is None:
+            self.key_sources[normalized] = [text]
+            grams = self.trigrams(normalized)
+            self.key_grams[normalized] = grams
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(normalized)
+        elif text not in sources:
+            sources.append(text)
+
+    def remove(self, text):
+        """文字列の登録を1件解除する"""
+        normalized = self.normalize(text)
+        if self.source_counts.get(text, 0) == 0:
+            return
+        self.source_counts[text] -= 1
+        if self.source_counts[text] > 0:
+            return
+        del self.source_counts[text]
+        sources = self.key_sources[normalized]
+        sources.remove(text)
+        if sources:
+            return
+        del self.key_sources[normalized]
+        for gram in self.key_grams.pop(normalized):
+            keys = self.grams[gram]
+            keys.remove(normalized)
+            if not keys:
+                del self.grams[gram]
+
+    def search(self, query, k=None, min_similarity=FUZZY_MIN_SIMILARITY):
+        """query に近い登録文字列を [(類似度, 元の文字列), ...] の類似度の高い順で返す"""
+        normalized = self.normalize(query)
+        if not normalized:
+            return []
+        query_grams = self.trigrams(normalized)
+        query_size = len(query_grams)
+        # 類似度が min_similarity 以上なら共通トライグラムは min_overlap 個以上必要なので、
+        # 出現頻度の低いトライグラムから probe_count 個を調べ、そのうち
+        # min_overlap - (query_size - probe_count) 個以上を共有する文字列だけを候補にする
+        min_overlap = math.ceil(min_similarity * query_size)
+        probe_count = min(query_size, query_size - min_overlap + 1 + self.EXTRA_PROBE_GRAMS)
+        required_hits = min_overlap - (query_size - probe_count)
+        probe_grams = sorted(query_grams, key=lambda gram: len(self.grams.get(gram, ())))[:probe_count]
+        hit_counts = Counter()
+        for gram in probe_grams:
+            keys = self.grams.get(gram)
+            if keys:
+                hit_counts.update(keys)
+
+        # トライグラム数が大きく異なる候補は類似度の計算前に除外する
+        min_size = min_similarity * query_size
+        max_size = query_size / min_similarity
+        results = []
+        for key, hits in hit_counts.items():
+            if hits < required_hits:
+                continue
+            key_grams = self.key_grams[key]
+            if not min_size <= len(key_grams) <= max_size:
+                continue
+            overlap = len(query_grams & key_grams)
+            similarity = overlap / (query_size + len(key_grams) - overlap)
+            if similarity >= min_similarity:
+                for source in self.key_sources[key]:
+                    results.append((similarity, source))
+        if k is not None:
+            return heapq.nlargest(k, results, key=lambda result: result[0])
+        return sorted(results, key=lambda result: result[0], reverse=True)
+
+def new_tag_index():
+    """空の検索インデックスを生成する関数"""
+    return {
+        # 完全一致用: 英語タグ名(小文字) -> [(登録順, カテゴリID, タグ), ...]
+        'exact': {},
+        # 単語一致用: 単語 -> [(登録順, カテゴリID, タグ), ...]
+        'tokens': {},
+        # 部分一致 (含む) 用: 全ての英語タグ名(小文字)を登録したオートマトン
+        'contained_matcher': AhoCorasickMatcher(),
+        # 部分一致 (含まれる) 用: 英語タグ名(小文字)の部分文字列インデックス
+        'en_substrings': NGramSubstringIndex(),
+        # 辞書検索用: 日本語説明(小文字) -> [(登録順, カテゴリID, タグ), ...] とその部分文字列インデックス
+        'ja': {},
+        'ja_substrings': NGramSubstringIndex(),
+        # 近似一致用: 英語タグ名(小文字)のトライグラム類似度インデックス
+        'fuzzy': TrigramFuzzyIndex(),
+        'next_seq': 0
+    }
+
+# 英語タグ名・日本語説明から作られ、構築に時間のかかる派生構造
+# (rebuild_tag_index(background=True) の直後は None で、TagIndexLoader が用意する)
+DERIVED_TAG_INDEX_KEYS = ('tokens', 'contained_matcher', 'en_substrings', 'ja_substrings', 'fuzzy')
+
+def add_derived_index_entry(tag_index, entry, tag_ja_lower):
+    """タグのエントリを検索インデックスの派生構造に登録する関数"""
+    tag_en_lower = entry[2].en_lower
+    tag_index['contained_matcher'].add(tag_en_lower)
+    tag_index['en_substrings'].add(tag_en_lower)
+    tag_index['fuzzy'].add(tag_en_lower)
+    tag_index['ja_substrings'].add(tag_ja_lower)
+    # 同じタグ内で単語が重複していてもポスティングは1件にする
+    for word in dict.fromkeys(split_tag_words(tag_en_lower)):
+        if word:
+            tag_index['tokens'].setdefault(word, []).append(entry)
+
+def remove_derived_index_entry(tag_index, tag, tag_ja_lower):
+    """タグを検索インデックスの派生構造から取り除く関数"""
+    tag_en_lower = tag.en_lower
+    # オートマトンからは削除できないため、検出したパターンは exact で存在を確認してから使う
+    tag_index['en_substrings'].remove(tag_en_lower)
+    tag_index['fuzzy'].remove(tag_en_lower)
+    tag_index['ja_substrings'].remove(tag_ja_lower)
+    for word in dict.fromkeys(split_tag_words(tag_en_lower)):
+        if word:
+            remove_index_entry(tag_index['tokens'], word, tag)
+
+def move_derived_ja_entry(tag_index, old_ja_lower, new_ja_lower):
+    """日本語説明の変更を検索インデックスの派生構造に反映する関数"""
+    tag_index['ja_substrings'].remove(old_ja_lower)
+    tag_index['ja_substrings'].add(new_ja_lower)
+
+def update_derived_index(operation, *args):
+    """派生構造を更新する関数 (裏で用意している間は、取り込み後に反映するよう記録しておく)"""
+    loader = app_state['tag_index_loader']
+    if loader is not None:
+        loader.pending.append((operation, args))
+        return
+    operation(app_state['tag_index'], *args)
+
+def index_tag(category_id, tag):
+    """1件のタグを検索インデックスに登録する関数"""
+    bump_dictionary_version()
+    tag_index = get_tag_index()
+    tag_en_lower = tag.en_lower
+    # 登録順を保持し、同じ信頼度のヒントを辞書順に並べられるようにする
+    entry = (tag_index['next_seq'], category_id, tag)
+    tag_index['next_seq'] += 1
+    tag_index['exact'].setdefault(tag_en_lower, []).append(entry)
+    tag_ja_lower = (tag.ja or '').lower()
+    tag_index['ja'].setdefault(tag_ja_lower, []).append(entry)
+    update_derived_index(add_derived_index_entry, entry, tag_ja_lower)
+
+def remove_index_entry(postings, key, tag):
+    """ポスティング (キー -> [(登録順, カテゴリID, タグ), ...]) からタグのエントリを取り除く関数"""
+    entries = postings.get(key)
+    if not entries:
+        return
+    entries[:] = [entry for entry in entries if entry[2] is not tag]
+    if not entries:
+        del postings[key]
+
+def unindex_tag(tag):
+    """1件のタグを検索インデックスから取り除く関数"""
+    bump_dictionary_version()
+    tag_index = get_tag_index()
+    remove_index_entry(tag_index['exact'], tag.en_lower, tag)
+    tag_ja_lower = (tag.ja or '').lower()
+    remove_index_entry(tag_index['ja'], tag_ja_lower, tag)
+    update_derived_index(remove_derived_index_entry, tag, tag_ja_lower)
+
+def update_tag_ja_index(tag, tag_ja):
+    """タグの日本語説明を更新し、検索インデックスにも反映する関数"""
+    bump_dictionary_version()
+    tag_index = get_tag_index()
+    old_ja_lower = (tag.ja or '').lower()
+    tag.ja = tag_ja
+    new_ja_lower = (tag_ja or '').lower()
+    if old_ja_lower == new_ja_lower:
+        return
+    old_entries = tag_index['ja'].get(old_ja_lower, [])
+    entry = next((e for e in old_entries if e[2] is tag), None)
+    if entry is None:
+        # インデックス未登録のタグ (辞書に追加される前) は何もしない
+        return
+    old_entries.remove(entry)
+    if not old_entries:
+        del tag_index['ja'][old_ja_lower]
+    tag_index['ja'].setdefault(new_ja_lower, []).append(entry)
+    update_derived_index(move_derived_ja_entry, old_ja_lower, new_ja_lower)
+
+def find_tags_containing(query_lower, ordered=True):
+    """英語タグ名が query_lower を含む辞書タグを返す関数 (ordered=True の場合は辞書順)"""
+    tag_index = get_tag_index()
+    if tag_index['en_substrings'] is None:
+        # 部分文字列インデックスの用意ができるまでは英語タグ名を順に調べる
+        keys = [key for key in tag_index['exact'] if query_lower in key]
+    else:
+        keys = tag_index['en_substrings'].search(query_lower)
+    entries = []
+    for key in keys:
+        entries.extend(tag_index['exact'][key])
+    if ordered:
+        entries.sort(key=lambda entry: entry[0])
+    return entries
+
+def search_dictionary_tags(query_lower):
+    """英語タグ名または日本語説明が query_lower を含む辞書タグを辞書順に返す関数"""
+    tag_index = get_tag_index()
+    entries = {entry[0]: entry for entry in find_tags_containing(query_lower)}
+    if tag_index['ja_substrings'] is None:
+        ja_keys = [key for key in tag_index['ja'] if query_lower in key]
+    else:
+        ja_keys = tag_index['ja_substrings'].search(query_lower)
+    for key in ja_keys:
+        for entry in tag_index['ja'][key]:
+            entries[entry[0]] = entry
+    return [entries[seq] for seq in sorted(entries)]
+
+def rebuild_tag_index(background=False, dictionary_path=None):
+    """辞書全体から検索インデックスを再構築する関数
+
+    background=True の場合は完全一致・日本語説明の表だけをすぐに作り、派生構造はキャッシュからの
+    読み込みまたは再構築を TagIndexLoader で裏で行う。用意ができるまで辞書検索は順に調べる方法で行い、
+    分類ヒントの計算は用意ができるのを待つ。キャッシュは dictionary_path (None の場合はアプリの保存先) の隣に置く。
+    """
+    bump_dictionary_version()
+    app_state['tag_index_loader'] = None
+    tag_index = new_tag_index()
+    app_state['tag_index'] = tag_index
+    if not background:
+        for category in app_state['dictionary'].get('categories', []):
+            for tag in category.get('tags', []):
+                index_tag(category['id'], tag)
+        return
+
+    for key in DERIVED_TAG_INDEX_KEYS:
+        tag_index[key] = None
+    # 派生構造の元になる (エントリ, 日本語説明(小文字)) を登録順に控えておく (裏のスレッドはこの控えだけを読む)
+    indexed_entries = []
+    for category in app_state['dictionary'].get('categories', []):
+        for tag in category.get('tags', []):
+            entry = (tag_index['next_seq'], category['id'], tag)
+            tag_index['next_seq'] += 1
+            tag_index['exact'].setdefault(tag.en_lower, []).append(entry)
+            tag_ja_lower = (tag.ja or '').lower()
+            tag_index['ja'].setdefault(tag_ja_lower, []).append(entry)
+            indexed_entries.append((entry, tag_ja_lower))
+    cache_location = get_index_cache_location(dictionary_path or get_dictionary_path()) if USE_INDEX_CACHE else None
+    loader = TagIndexLoader(indexed_entries, cache_location)
+    app_state['tag_index_loader'] = loader
+    loader.start()
+
+def install_tag_index_when_ready():
+    """裏で用意している派生構造を、用意ができ次第メインスレッドで取り込む関数 (GUI用)"""
+    get_tag_index()
+    if app_state['tag_index_loader'] is not None:
+        root.after(100, install_tag_index_when_ready)
+
+def get_tag_index(wait=False):
+    """検索インデックスを返す関数 (裏で用意していた派生構造の用意ができていれば取り込む)
+
+    wait=True の場合は派生構造の用意ができるまで待つ。
+    """
+    loader = app_state['tag_index_loader']
+    if loader is not None and (loader.done.is_set() or wait):
+        loader.done.wait()
+        install_derived_tag_index(loader)
+    return app_state['tag_index']
+
+def install_derived_tag_index(loader):
+    """TagIndexLoader が用意した派生構造を検索インデックスに取り込み、用意している間の変更を反映する関数"""
+    app_state['tag_index_loader'] = None
+    tag_index = app_state['tag_index']
+    derived = loader.derived
+    if derived is None:
+        # 裏での用意に失敗した場合は控えから作り直す
+        print(f"検索インデックスを裏で用意できなかったため再構築します: {loader.error}", file=sys.stderr)
+        derived = build_derived_tag_index(loader.indexed_entries)
+    tag_index.update(derived)
+    for operation, args in loader.pending:
+        operation(tag_index, *args)
+    # 順に調べる方法で計算した結果を使わないよう版数を進める
+    bump_dictionary_version()
+
+def build_derived_tag_index(indexed_entries):
+    """(エントリ, 日本語説明(小文字)) の控えから検索インデックスの派生構造を作る関数"""
+    derived = {
+        'tokens': {},
+        'contained_matcher': AhoCorasickMatcher(),
+        'en_substrings': NGramSubstringIndex(),
+        'ja_substrings': NGramSubstringIndex(),
+        'fuzzy': TrigramFuzzyIndex()
+    }
+    for entry, tag_ja_lower in indexed_entries:
+        add_derived_index_entry(derived, entry, tag_ja_lower)
+    # 失敗遷移の計算も最初の検索を待たずに済ませておく
+    derived['contained_matcher'].build()
+    return derived
+
+def hash_indexed_entries(indexed_entries):
+    """派生構造の元になる英語タグ名・日本語説明の並びのハッシュ値を返す関数 (キャッシュのキーに使う)"""
+    digest = hashlib.blake2b(digest_size=20)
+    for entry, tag_ja_lower in indexed_entries:
+        digest.update(f"{entry[2].en_lower}\0{tag_ja_lower}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def get_index_cache_location(dictionary_path):
+    """辞書の保存先に対応する検索インデックスのキャッシュの (ディレクトリ, ファイル名の接頭辞) を返す関数
+
+    キャッシュは辞書の保存先と同じディレクトリの INDEX_CACHE_DIRECTORY に置き、同じディレクトリの
+    他の辞書のキャッシュと区別するため、ファイル名を保存先の名前から始める。
+    """
+    dictionary_path = os.path.abspath(dictionary_path)
+    cache_directory = os.path.join(os.path.dirname(dictionary_path), INDEX_CACHE_DIRECTORY)
+    return cache_directory, f"tag_index.{os.path.basename(dictionary_path)}."
+
+def get_index_cache_path(cache_location, content_hash):
+    """検索インデックスのキャッシュファイルのパスを返す関数 (形式の版数と内容のハッシュ値をファイル名に含める)"""
+    cache_directory, cache_prefix = cache_location
+    return os.path.join(cache_directory, f"{cache_prefix}v{INDEX_CACHE_SCHEMA_VERSION}.{content_hash}.pickle")
+
+def is_index_cache_file(filename, cache_location):
+    """ファイル名が同じ辞書の保存先の検索インデックスのキャッシュ (版数・内容は問わない) かを返す関数"""
+    cache_prefix = cache_location[1]
+    # 接頭辞の後ろが版数とハッシュ値だけのものに限り、名前が前方一致する別の辞書のキャッシュは対象にしない
+    return filename.startswith(cache_prefix) and re.fullmatch(r'v\d+\.[0-9a-f]+\.pickle', filename[len(cache_prefix):]) is not None
+
+def read_index_cache(cache_path, indexed_entries):
+    """キャッシュファイルから派生構造を読み込む関数 (キャッシュがなければ None)"""
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, 'rb') as f:
+        payload = pickle.load(f)
+    derived = {}
+    for key, cls in (('contained_matcher', AhoCorasickMatcher), ('en_substrings', NGramSubstringIndex),
+                     ('ja_substrings', NGramSubstringIndex), ('fuzzy', TrigramFuzzyIndex)):
+        # 実行方法 (スクリプト / モジュール) によってクラスの参照先が変わらないよう、属性だけを保存している
+        structure = cls.__new__(cls)
+        structure.__dict__.update(payload[key])
+        derived[key] = structure
+    # 単語のポスティングは登録順で保存しているため、控えのエントリに戻す
+    derived['tokens'] = {word: [indexed_entries[seq][0] for seq in seqs] for word, seqs in payload['tokens'].items()}
+    return derived
+
+def write_index_cache(cache_location, cache_path, derived):
+    """派生構造をキャッシュファイルに書き込み、同じ辞書の保存先の古いキャッシュを削除する関数"""
+    cache_directory = cache_location[0]
+    os.makedirs(cache_directory, exist_ok=True)
+    payload = {key: vars(derived[key]) for key in ('contained_matcher', 'en_substrings', 'ja_substrings', 'fuzzy')}
+    # rebuild_tag_index(background=True) の登録順は控えの位置と一致する
+    payload['tokens'] = {word: [entry[0] for entry in entries] for word, entries in derived['tokens'].items()}
+    write_file_atomically(cache_path, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    for filename in os.listdir(cache_directory):
+        if is_index_cache_file(filename, cache_location) and os.path.join(cache_directory, filename) != cache_path:
+            remove_file_if_exists(os.path.join(cache_directory, filename))
+
+class TagIndexLoader:
+    """検索インデックスの派生構造を、キャッシュからの読み込みまたは再構築によってスレッドで用意するクラス"""
+
+    def __init__(self, indexed_entries, cache_location=None):
+        self.indexed_entries = indexed_entries  # [(エントリ, 日本語説明(小文字)), ...] (登録順)
+        self.cache_location = cache_location    # get_index_cache_location の戻り値 (None の場合はキャッシュを使わない)
+        self.pending = []       # 用意している間の派生構造への変更 [(関数, 引数), ...] (メインスレッドのみが触る)
+        self.derived = None
+        self.error = None
+        self.from_cache = False
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        try:
+            cache_path = None
+            if self.cache_location is not None:
+                cache_path = get_index_cache_path(self.cache_location, hash_indexed_entries(self.indexed_entries))
+                try:
+                    self.derived = read_index_cache(cache_path, self.indexed_entries)
+                    self.from_cache = self.derived is not None
+                except Exception as e:
+                    print(f"検索インデックスのキャッシュを読み込めないため再構築します: {e}", file=sys.stderr)
+            if self.derived is None:
+                derived = build_derived_tag_index(self.indexed_entries)
+                if cache_path is not None:
+                    # 取り込み後はメインスレッドが派生構造を変更するため、書き込みは取り込み前に済ませる
+                    try:
+                        write_index_cache(self.cache_location, cache_path, derived)
+                    except OSError as e:
+                        print(f"検索インデックスのキャッシュを保存できませんでした: {e}", file=sys.stderr)
+                self.derived = derived
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+def invalidate_category_path_cache():
+    """カテゴリの追加・名前変更・親変更・削除時にカテゴリパスのキャッシュを破棄する関数"""
+    bump_dictionary_version()
+    app_state['category_path_cache'] = None
+
+def get_category_path_cache():
+    """カテゴリID <-> カテゴリパスの対応表を返す関数 (未構築の場合は構築する)"""
+    cache = app_state['category_path_cache']
+    if cache is None:
+        cache = build_category_path_maps(app_state['dictionary'].get('categories', []))
+        app_state['category_path_cache'] = cache
+    return cache
+
+def build_category_path_maps(categories):
+    """カテゴリのリストから {'id_to_path': ..., 'path_to_id': ...} の対応表を作る関数"""
+    all_categories_map = {cat['id']: cat for cat in categories}
+    id_to_path = {}
+    # トップレベルまで親をたどれるカテゴリのみパスから逆引きできる
+    rooted_ids = set()
+
+    def resolve(category_id):
+        # 親から順にパスを確定させる (循環参照は途中で打ち切る)
+        chain = []
+        current_id = category_id
+        while current_id in all_categories_map and current_id not in id_to_path and current_id not in chain:
+            chain.append(current_id)
+            current_id = all_categories_map[current_id].get('parent_id')
+        parent_path = id_to_path.get(current_id, "")
+        parent_rooted = current_id is None or current_id in rooted_ids
+        for chain_id in reversed(chain):
+            name = all_categories_map[chain_id]['name']
+            # カテゴリパスは分類ヒントや表の行で繰り返し使われるため intern して共有する
+            parent_path = sys.intern(f"{parent_path} / {name}" if parent_path else name)
+            id_to_path[chain_id] = parent_path
+            if parent_rooted:
+                rooted_ids.add(chain_id)
+
+    path_to_id = {}
+    for category_id in all_categories_map:
+        if category_id not in id_to_path:
+            resolve(category_id)
+        if category_id in rooted_ids:
+            # 同じパスが複数ある場合は先に登録されたカテゴリを優先する
+            path_to_id.setdefault(id_to_path[category_id], category_id)
+
+    return {'id_to_path': id_to_path, 'path_to_id': path_to_id}
 
 def get_category_path(category_id):
     """カテゴリIDからカテゴリパス（例: 服装 / 女性 / トップス）を取得する関数"""
-    path = []
-    current_id = category_id
-    # カテゴリマップを一度構築して効率化
-    all_categories_map = {cat['id']: cat for cat in app_state['dictionary']['categories']}
-    while current_id:
-        category = all_categories_map.get(current_id)
-        if category:
-            path.insert(0, category['name'])
-            current_id = category.get('parent_id')
-        else:
-            break
-    return " / ".join(path) if path else ""
+    return get_category_path_cache()['id_to_path'].get(category_id, "")
 
 def find_category_by_id(category_id, categories=None):
-    """カテゴリIDからカテゴリ情報を検索する関数"""
+    """カテゴリIDからカテゴリ情報を検索する関数 (categories を指定した場合はそのリストを順に調べる)"""
     if categories is None:
-        categories = app_state['dictionary']['categories']
+        return app_state['store'].get_category(category_id)
     for category in categories:
         if category['id'] == category_id:
             return category
@@ -76,39 +2308,98 @@ def find_category_by_id(category_id, categories=None):
 
 def get_category_id_from_path(path_string):
     """カテゴリパス（例: 服装 / 女性）からカテゴリIDを取得する関数"""
-    path_parts = path_string.split(' / ')
-    current_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') is None] # トップレベルカテゴリから開始
-    current_category = None
-    
-    for i, name_part in enumerate(path_parts):
-        found = None
-        for cat in current_categories:
-            if cat['name'] == name_part:
-                found = cat
-                break
-        if found:
-            current_category = found
-            # 次のレベルの子カテゴリを準備
-            current_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == current_category['id']]
-        else:
-            return None # パスが見つからない
-    return current_category['id'] if current_category else None
-
+    return get_category_path_cache()['path_to_id'].get(path_string)
+
+
+# --- 辞書の変更 ---
+# 辞書データの変更はここの関数を通し、検索インデックス・タグの列形式の表と変更の記録 (app_state['changes']) を同時に更新する
+
+def get_tag_columns():
+    """タグの列形式の表を返す関数 (未作成の場合は辞書データから作成する)"""
+    if app_state['tag_columns'] is None:
+        app_state['tag_columns'] = TagColumns(app_state['dictionary'].get('categories', []))
+    return app_state['tag_columns']
+
+def update_tag_columns(operation, *args):
+    """作成済みのタグの列形式の表を更新する関数 (未作成の場合は作成時に辞書データから読み込むため何もしない)"""
+    tag_columns = app_state['tag_columns']
+    if tag_columns is not None:
+        operation(tag_columns, *args)
+
+def set_tag_ja(category_id, tag, tag_ja):
+    """タグの日本語説明を更新して変更を記録する関数 (値が同じなら何もせず False を返す)"""
+    if tag.ja == tag_ja:
+        return False
+    update_tag_ja_index(tag, tag_ja)
+    update_tag_columns(TagColumns.update_ja, tag)
+    app_state['changes'].record(make_upsert_tag_record(category_id, tag.en, tag_ja))
+    return True
+
+def insert_tag(category, tag_en, tag_ja):
+    """カテゴリに新しいタグを追加して変更を記録する関数"""
+    new_tag = TagRecord(tag_en, tag_ja, category['id'])
+    app_state['store'].add_tag(category, new_tag)
+    index_tag(category['id'], new_tag)
+    update_tag_columns(TagColumns.append, new_tag)
+    app_state['changes'].record(make_upsert_tag_record(category['id'], tag_en, tag_ja))
+    return new_tag
+
+def upsert_tag(category, tag_en, tag_ja):
+    """英語タグ名 (大文字小文字を区別しない) が辞書のどのカテゴリにもなければ category に追加し、
+    あればそのタグの日本語説明を更新する関数 (同じ英語タグ名のタグを辞書に2つ作らないよう、タグの書き込みはこの関数を通す)
+
+    戻り値は (タグのあるカテゴリ, タグ, 'added' / 'updated' / 'unchanged')。
+    """
+    found = app_state['store'].find_tag(tag_en)
+    if found is None:
+        return category, insert_tag(category, tag_en, tag_ja), 'added'
+    existing_category, existing_tag = found
+    if (existing_tag.ja or '').strip() == tag_ja: # 比較時もstripを適用
+        return existing_category, existing_tag, 'unchanged'
+    set_tag_ja(existing_category['id'], existing_tag, tag_ja)
+    return existing_category, existing_tag, 'updated'
+
+def remove_tags(category, tags_to_remove):
+    """カテゴリから指定したタグを削除して変更を記録し、削除したタグのリストを返す関数
+
+    保存先 (ジャーナルの再適用・SQLite) と同じく英語タグ名は大文字小文字を区別せずに比べ、
+    同じカテゴリにある大文字小文字だけが異なるタグも一緒に削除する。
+    """
+    removing_keys = {tag.en_lower for tag in tags_to_remove}
+    tags_to_remove = [tag for tag in category.get('tags', []) if tag.en_lower in removing_keys]
+    app_state['store'].remove_tags(category, tags_to_remove)
+    for tag in tags_to_remove:
+        unindex_tag(tag)
+        update_tag_columns(TagColumns.remove, tag)
+    for tag_en in {tag.en_lower: tag.en for tag in tags_to_remove}.values():
+        app_state['changes'].record(make_delete_tag_record(category['id'], tag_en))
+    return tags_to_remove
+
+def insert_category(category):
+    """辞書にカテゴリを追加して変更を記録する関数"""
+    app_state['store'].add_category(category)
+    update_tag_columns(TagColumns.add_category, category)
+    invalidate_category_path_cache()
+    app_state['changes'].record(make_add_category_record(category))
+
+def remove_category(category_id):
+    """辞書からカテゴリを削除して変更を記録する関数"""
+    app_state['store'].remove_category(category_id)
+    update_tag_columns(TagColumns.remove_category, category_id)
+    invalidate_category_path_cache()
+    app_state['changes'].record(make_delete_category_record(category_id))
 
 def add_tag_to_dictionary(tag_en, tag_ja, category_id):
     """タグを辞書に追加する関数"""
     category = find_category_by_id(category_id)
     if category:
-        # 既存のタグをチェック (英語タグ名で大文字小文字を区別せずチェック)
-        existing_tag = next((t for t in category.setdefault('tags', []) if t['en'].lower() == tag_en.lower()), None)
-        if existing_tag:
-            # 既存のタグが見つかった場合、日本語説明を更新 (stripを適用)
-            existing_tag['ja'] = tag_ja.strip()
-            return True, f"タグ '{tag_en}' の日本語説明をカテゴリ '{category['name']}' で更新しました。"
-        else:
-            # 新規タグとして追加 (stripを適用)
-            category.setdefault('tags', []).append({"en": tag_en, "ja": tag_ja.strip()})
+        # 既存のタグは辞書全体から探す (英語タグ名で大文字小文字を区別せずチェック、stripを適用)
+        existing_category, _, status = upsert_tag(category, tag_en, tag_ja.strip())
+        if status == 'added':
             return True, f"タグ '{tag_en}' をカテゴリ '{category['name']}' に追加しました。"
+        if existing_category is not category:
+            return True, f"タグ '{tag_en}' は既にカテゴリ '{get_category_path(existing_category['id'])}' にあるため、そのタグの日本語説明を更新しました。"
+        return True, f"タグ '{tag_en}' の日本語説明をカテゴリ '{category['name']}' で更新しました。"
     else:
         return False, "指定されたカテゴリが見つかりません。"
 
@@ -354,7 +2645,7 @@ def generate_initial_dictionary():
         }
       ]
     }
-    app_state['dictionary'] = initial_data
+    set_dictionary(initial_data)
     save_dictionary()
     messagebox.showinfo("情報", "初期辞書を生成しました。")
     populate_dict_treeview() # 辞書管理タブのTreeviewを更新
@@ -363,92 +2654,293 @@ def generate_initial_dictionary():
     # populate_category_hierarchy_treeview(category_hierarchy_tree_classify) # 分類タブの階層Treeviewを更新
 
 
-def get_classification_hint(tag_en):
-    """タグの自動分類ヒントを生成する関数"""
-    hints = []
+class HintCache:
+    """分類ヒントの計算結果を保持するサイズ上限付きのLRUキャッシュ"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """キャッシュを参照する (見つからない場合は None)"""
+        hints = self.entries.get(key)
+        if hints is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return hints
+
+    def put(self, key, hints):
+        """計算結果を登録し、上限を超えた分は最も古いものから破棄する"""
+        self.entries[key] = hints
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+hint_cache = HintCache(HINT_CACHE_SIZE)
+
+def fuzzy_hint_confidence(similarity):
+    """トライグラム類似度を近似一致ヒントの信頼度に換算する関数
+
+    類似度の下限 (0.5) で 0.6、区切り文字だけが異なる場合 (類似度 1.0) で 0.95 となる。
+    類似度がおよそ 0.65 を超える近いタグは部分一致 (含まれる) のヒントより優先される。
+    """
+    return round(0.25 + 0.7 * similarity, 2)
+
+def contained_hint_confidence(dict_tag_length, query_length):
+    """入力に含まれる辞書タグの信頼度を、辞書タグが入力の何割を占めるかで換算する関数
+
+    入力のほぼ全体を占める場合は 0.8 に近づき、短いタグが長い入力の一部に現れただけの場合は 0.6 に近づく
+    (例: "looking at viwer" に含まれる "ki" は 0.62 となり、近似一致の "looking at viewer" (0.76) より下になる)。
+    """
+    return round(0.6 + 0.2 * dict_tag_length / query_length, 2)
+
+def make_classification_hint(hint_type, category_id, dict_tag, confidence):
+    """分類ヒントの辞書を生成するヘルパー関数"""
+    return {
+        'type': hint_type,
+        'category_id': category_id,
+        'category_path': get_category_path(category_id),
+        'tag_en': dict_tag['en'] if dict_tag else None,
+        'tag_ja': (dict_tag.get('ja') or '説明なし') if dict_tag else None,
+        'confidence': confidence
+    }
+
+def get_classification_hint(tag_en, k=None):
+    """タグの自動分類ヒントを信頼度の高い順に返す関数 (k を指定した場合は上位k件のみ)"""
+    # 正規化したタグと辞書の版数をキーにキャッシュする (辞書が変更されると版数が変わり自然に無効になる)
     tag_en_lower = tag_en.lower()
+    cache_key = (tag_en_lower, app_state['dictionary_version'], k)
+    hints = hint_cache.get(cache_key)
+    if hints is None:
+        hints = compute_classification_hint(tag_en_lower, k)
+        hint_cache.put(cache_key, hints)
+    return hints
+
+def compute_classification_hint(tag_en_lower, k=None):
+    """キャッシュを使わずに分類ヒントを計算する関数"""
+    # 分類ヒントには派生構造が全て必要なため、裏で用意している場合は待つ
+    tag_index = get_tag_index(wait=True)
+
+    # 完全一致はインデックスから直接引く (辞書順で最初のタグを採用)
+    exact_entries = tag_index['exact'].get(tag_en_lower)
+    if exact_entries:
+        _, category_id, dict_tag = exact_entries[0]
+        return [make_classification_hint('完全一致', category_id, dict_tag, 1.0)]
 
-    for category in app_state['dictionary'].get('categories', []):
-        for dict_tag in category.get('tags', []):
-            dict_tag_en_lower = dict_tag['en'].lower()
-            if tag_en_lower == dict_tag_en_lower:
-                hints.append({
-                    'type': '完全一致',
-                    'category_id': category['id'],
-                    'category_path': get_category_path(category['id']),
-                    'tag_en': dict_tag['en'],
-                    'tag_ja': dict_tag.get('ja', '説明なし'),
-                    'confidence': 1.0
-                })
-                return hints
-
-            if dict_tag_en_lower in tag_en_lower:
-                 hints.append({
-                     'type': '部分一致 (含む)',
-                     'category_id': category['id'],
-                     'category_path': get_category_path(category['id']),
-                     'tag_en': dict_tag['en'],
-                     'tag_ja': dict_tag.get('ja', '説明なし'),
-                     'confidence': 0.8
-                 })
-
-            if tag_en_lower in dict_tag_en_lower:
-                 hints.append({
-                     'type': '部分一致 (含まれる)',
-                     'category_id': category['id'],
-                     'category_path': get_category_path(category['id']),
-                     'tag_en': dict_tag['en'],
-                     'tag_ja': dict_tag.get('ja', '説明なし'),
-                     'confidence': 0.7
-                 })
-
-    words = re.split(r'[ _-]', tag_en_lower)
-    for word in words:
-        if not word: continue
-        for category in app_state['dictionary'].get('categories', []):
-            if word in category['name'].lower():
-                 hints.append({
-                     'type': 'カテゴリ名に単語一致',
-                     'category_id': category['id'],
-                     'category_path': get_category_path(category['id']),
-                     'tag_en': None,
-                     'tag_ja': None,
-                     'confidence': 0.6
-                 })
-            for dict_tag in category.get('tags', []):
-                 dict_words = re.split(r'[ _-]', dict_tag['en'].lower())
-                 if word in dict_words:
-                      hints.append({
-                          'type': '辞書タグの単語に一致',
-                          'category_id': category['id'],
-                          'category_path': get_category_path(category['id']),
-                          'tag_en': dict_tag['en'],
-                          'tag_ja': dict_tag.get('ja', '説明なし'),
-                          'confidence': 0.5
-                      })
-
-    hints = sorted(hints, key=lambda x: x['confidence'], reverse=True)
+    hints = []
     seen_hints = set()
-    unique_hints = []
-    for hint in hints:
-        hint_identifier = (hint['category_id'], hint.get('tag_en'))
-        if hint_identifier not in seen_hints:
+
+    def collect(hint_type, confidence, candidates):
+        # 重複 (カテゴリID, 英語タグ名) を除いてヒントを追加し、k件に達したら True を返す
+        for category_id, dict_tag in candidates:
+            hint_identifier = (category_id, dict_tag['en'] if dict_tag else None)
+            if hint_identifier in seen_hints:
+                continue
             seen_hints.add(hint_identifier)
-            unique_hints.append(hint)
+            hints.append(make_classification_hint(hint_type, category_id, dict_tag, confidence))
+            if k is not None and len(hints) >= k:
+                return True
+        return False
+
+    def in_dictionary_order(entries):
+        # 同じ信頼度の候補は辞書順に並べる。k指定時は必要な件数だけをヒープで取り出し、
+        # 重複で足りなくなった場合にのみ残りをソートする
+        if k is None:
+            head_size = len(entries)
+        else:
+            head_size = k - len(hints) + len(seen_hints)
+        head = heapq.nsmallest(head_size, entries, key=lambda entry: entry[0])
+        for _, category_id, dict_tag in head:
+            yield category_id, dict_tag
+        if len(entries) > head_size:
+            for _, category_id, dict_tag in sorted(entries, key=lambda entry: entry[0])[head_size:]:
+                yield category_id, dict_tag
+
+    def containing_candidates():
+        # 入力を含む辞書タグは部分文字列インデックスから引く
+        return in_dictionary_order(find_tags_containing(tag_en_lower, ordered=False))
+
+    words = [word for word in split_tag_words(tag_en_lower) if word]
+
+    def category_name_candidates():
+        for word in words:
+            for category in app_state['dictionary'].get('categories', []):
+                if word in category['name'].lower():
+                    yield category['id'], None
+
+    def token_candidates():
+        # 辞書タグの単語はインデックスのポスティングから引く
+        for word in words:
+            for _, category_id, dict_tag in tag_index['tokens'].get(word, []):
+                yield category_id, dict_tag
+
+    # 近似一致・部分一致 (含む) は候補ごとに信頼度が変わるため、先に求めて信頼度の高い順 (同じなら辞書順) に並べておく
+    scored_candidates = []
+    # 近似一致の候補は1つの英語タグ名から1件以上のヒントになるため、上位k件の英語タグ名まで調べれば足りる
+    for similarity, dict_tag_en_lower in tag_index['fuzzy'].search(tag_en_lower, k):
+        for seq, category_id, dict_tag in tag_index['exact'][dict_tag_en_lower]:
+            scored_candidates.append((fuzzy_hint_confidence(similarity), seq, '近似一致', category_id, dict_tag))
+    # 入力に含まれる辞書タグはオートマトンで1回の走査により検出する
+    for pattern in set(tag_index['contained_matcher'].find_all(tag_en_lower)):
+        confidence = contained_hint_confidence(len(pattern), len(tag_en_lower))
+        # 削除済みのタグのパターンはオートマトンに残っているため、exact にないものは無視する
+        for seq, category_id, dict_tag in tag_index['exact'].get(pattern, ()):
+            scored_candidates.append((confidence, seq, '部分一致 (含む)', category_id, dict_tag))
+    scored_candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+    scored_position = 0
+
+    def collect_scored(above_confidence):
+        # 次の段より信頼度が高い近似一致・部分一致 (含む) のヒントを先に追加する
+        nonlocal scored_position
+        while scored_position < len(scored_candidates) and scored_candidates[scored_position][0] > above_confidence:
+            confidence, _, hint_type, category_id, dict_tag = scored_candidates[scored_position]
+            scored_position += 1
+            if collect(hint_type, confidence, [(category_id, dict_tag)]):
+                return True
+        return False
+
+    # 信頼度の高い段から順に評価し、k件そろった時点で下位の段は計算しない
+    hint_tiers = (
+        ('部分一致 (含まれる)', 0.7, containing_candidates),
+        ('カテゴリ名に単語一致', 0.6, category_name_candidates),
+        ('辞書タグの単語に一致', 0.5, token_candidates),
+    )
+    for hint_type, confidence, candidates in hint_tiers:
+        if collect_scored(confidence) or collect(hint_type, confidence, candidates()):
+            break
+    else:
+        collect_scored(0)
+
+    return hints
+
+def get_best_classification_hint(tag_en):
+    """最も信頼度の高い分類ヒントのみを返す関数"""
+    hints = get_classification_hint(tag_en, k=1)
+    return hints[0] if hints else None
+
+def summarize_classification_hint(hint):
+    """ヒントから未分類タグ表に表示する (日本語説明, カテゴリパス) を取り出す関数"""
+    if not hint:
+        return None
+    tag_ja = hint.get('tag_ja') or ''
+    return (tag_ja if tag_ja != '説明なし' else '').strip(), hint.get('category_path', '') # stripを適用
+
+def init_classification_worker(dictionary_snapshot):
+    """並列分類用ワーカープロセスの初期化関数 (辞書のスナップショットはワーカーごとに1回だけ受け取る)"""
+    set_dictionary(dictionary_snapshot)
+
+def classify_tags_chunk(tags_chunk):
+    """ワーカープロセスでタグのチャンクの最良ヒントを計算する関数"""
+    return [summarize_classification_hint(get_best_classification_hint(tag_en)) for tag_en in tags_chunk]
+
+class ClassificationPool:
+    """並列分類用のプロセスプールを保持し、辞書の版数とワーカー数が変わるまで使い回すクラス
+
+    ワーカーは起動時に辞書のスナップショットを1回だけ受け取って検索インデックスを作るため、
+    同じ版の辞書で続けて分類する間 (コマンドラインでのチャンクごとの分類など) はプールを作り直さない。
+    """
 
-    return unique_hints
+    def __init__(self):
+        self.executor = None
+        self.dictionary_version = None
+        self.workers = None
+
+    def get_executor(self, workers):
+        """現在の辞書の版数とワーカー数のプールを返す (異なる場合は作り直す)"""
+        if self.executor is not None and (self.dictionary_version != app_state['dictionary_version'] or self.workers != workers):
+            self.shutdown()
+        if self.executor is None:
+            # Tkのメインループやスレッドを複製しないよう、どのOSでも spawn でワーカーを起動する
+            self.executor = ProcessPoolExecutor(max_workers=workers,
+                                                mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_classification_worker,
+                                                initargs=(snapshot_dictionary(app_state['dictionary']),))
+            self.dictionary_version = app_state['dictionary_version']
+            self.workers = workers
+        return self.executor
+
+    def shutdown(self):
+        """プールのワーカーを終了させる (完了を待たない)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+classification_pool = ClassificationPool()
+
+def classify_tags_in_parallel(tags_list, workers, chunk_size=CLASSIFY_CHUNK_SIZE):
+    """タグのリストをチャンクに分けてプロセスプールで分類し、入力順の結果を返す関数"""
+    chunks = [tags_list[i:i + chunk_size] for i in range(0, len(tags_list), chunk_size)]
+    executor = classification_pool.get_executor(workers)
+    results = []
+    try:
+        # executor.map はチャンクの投入順に結果を返す
+        for chunk_results in executor.map(classify_tags_chunk, chunks):
+            results.extend(chunk_results)
+    except Exception:
+        # ワーカーが異常終了したプールは使えないため、次回は作り直す
+        classification_pool.shutdown()
+        raise
+    return results
+
+def get_classify_workers(workers=None):
+    """分類に使うワーカープロセス数を返す関数 (None の場合は CLASSIFY_WORKERS、未設定ならCPUコア数)"""
+    if workers is None:
+        workers = CLASSIFY_WORKERS or os.cpu_count() or 1
+    return workers
+
+def get_classification_hints_batch(tags_list, workers=None, parallel=None):
+    """タグのリストの最良ヒントをまとめて計算し、未分類タグ用の表を返す関数
+
+    parallel が None の場合は、重複を除いたタグ数が CLASSIFY_PARALLEL_MIN_TAGS 以上の時だけプロセスプールを使う。
+    入力を分けて呼び出す場合 (コマンドラインのチャンクごとの分類など) は、呼び出し側が入力全体で判定して True / False を渡す。
+    """
+    tags_lower = [tag_en.lower() for tag_en in tags_list]
+
+    # 同じタグ (大文字小文字を区別しない) のヒントは1回だけ計算する
+    unique_tags_lower = list(dict.fromkeys(tags_lower))
+    workers = get_classify_workers(workers)
+    if parallel is None:
+        parallel = len(unique_tags_lower) >= CLASSIFY_PARALLEL_MIN_TAGS
+
+    summaries = None
+    if workers > 1 and parallel and unique_tags_lower:
+        try:
+            summaries = classify_tags_in_parallel(unique_tags_lower, workers)
+        except Exception as e:
+            print(f"並列分類に失敗したため逐次処理に切り替えます: {e}", file=sys.stderr)
+    if summaries is None:
+        summaries = [summarize_classification_hint(get_best_classification_hint(tag_en_lower)) for tag_en_lower in unique_tags_lower]
+
+    suggested_ja_map = {}
+    suggested_cat_path_map = {}
+    for tag_en_lower, summary in zip(unique_tags_lower, summaries):
+        if summary:
+            suggested_ja_map[tag_en_lower], suggested_cat_path_map[tag_en_lower] = summary
+
+    return RowTable(TAG_TABLE_COLUMNS, ({
+        "英語タグ名": tag_en,
+        "日本語説明": suggested_ja_map.get(tag_en_lower, ''),
+        "カテゴリ": suggested_cat_path_map.get(tag_en_lower, "--カテゴリを選択--")
+    } for tag_en, tag_en_lower in zip(tags_list, tags_lower)))
 
 # --- UI更新ヘルパー ---
 
-def update_treeview(tree_widget, df_data):
-    """Treeviewの内容を更新する汎用関数"""
+def update_treeview(tree_widget, table, columns=None):
+    """Treeviewの内容を更新する汎用関数 (columns を指定した場合はその列だけを表示する)"""
     for item in tree_widget.get_children():
         tree_widget.delete(item)
     
-    for index, row in df_data.iterrows():
-        # Ensure all values are strings before inserting into Treeview
-        values_as_strings = [str(val) if val is not None else '' for val in list(row)]
-        tree_widget.insert("", "end", iid=index, values=values_as_strings)
+    for index, row in table.iter_rows():
+        tree_widget.insert("", "end", iid=index, values=table.row_values(index, columns))
     
     tree_widget.selection_remove(tree_widget.selection())
 
@@ -463,12 +2955,10 @@ def update_category_dropdowns():
             category_options_list.append(current_path)
             category_path_to_id_map[current_path] = cat['id']
             # 子カテゴリも再帰的に追加
-            children = [c for c in app_state['dictionary']['categories'] if c.get('parent_id') == cat['id']]
-            flatten_categories_for_dropdown(children, current_path)
+            flatten_categories_for_dropdown(app_state['store'].get_children(cat['id']), current_path)
 
 
-    top_level_categories = [cat for cat in app_state['dictionary'].get('categories', []) if cat.get('parent_id') is None]
-    flatten_categories_for_dropdown(top_level_categories)
+    flatten_categories_for_dropdown(app_state['store'].get_children(None))
 
     global all_category_options, all_category_path_to_id
     all_category_options = category_options_list
@@ -546,22 +3036,21 @@ def add_new_category(name_entry, parent_combobox, target_notebook_tab_index=None
     # Check for duplicate category names at the same level (simple check)
     parent_id = all_category_path_to_id.get(parent_path) if parent_path != "--カテゴリを選択--" else None
 
-    for cat in app_state['dictionary']['categories']:
-        if cat['name'].lower() == new_name.lower() and cat.get('parent_id') == parent_id:
-            messagebox.showwarning("警告", f"カテゴリ '{new_name}' は既に存在します。")
-            return
+    if app_state['store'].find_child_by_name(parent_id, new_name) is not None:
+        messagebox.showwarning("警告", f"カテゴリ '{new_name}' は既に存在します。")
+        return
 
     # Generate a simple unique ID
     # UUIDの使用を推奨
     new_id = str(uuid.uuid4()) # ユニークなIDを生成
     
-    app_state['dictionary']['categories'].append({
+    insert_category({
         "id": new_id,
         "name": new_name,
         "parent_id": parent_id,
         "tags": []
     })
-    save_dictionary()
+    commit_changes()
     messagebox.showinfo("情報", f"カテゴリ '{new_name}' を追加しました。")
     name_entry.delete(0, tk.END)
     parent_combobox.set("--カテゴリを選択--")
@@ -595,16 +3084,17 @@ def add_direct_tag(english_entry, japanese_entry, category_combobox):
 
     success, message = add_tag_to_dictionary(tag_en, tag_ja, category_id)
     if success:
-        save_dictionary()
+        changed = commit_changes()
         messagebox.showinfo("情報", message)
         english_entry.delete(0, tk.END)
         japanese_entry.delete(0, tk.END)
         category_combobox.set("--カテゴリを選択--")
-        populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get()) # フィルタを維持して更新
-        update_category_dropdowns()
-        update_available_tags_treeview()
-        populate_category_hierarchy_treeview(category_hierarchy_tree_manage)
-        populate_category_hierarchy_treeview(category_hierarchy_tree_classify)
+        # 同じ内容のタグを登録し直した場合は表示を更新しない (タグの追加ではカテゴリ構成は変わらない)
+        if changed:
+            populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get()) # フィルタを維持して更新
+            update_available_tags_treeview()
+            populate_category_hierarchy_treeview(category_hierarchy_tree_manage)
+            populate_category_hierarchy_treeview(category_hierarchy_tree_classify)
     else:
         messagebox.showwarning("警告", message)
 
@@ -612,7 +3102,7 @@ def add_direct_tag(english_entry, japanese_entry, category_combobox):
 # --- カテゴリ階層Treeviewのヘルパー関数 ---
 def get_all_categories_flat_map():
     """全カテゴリをIDをキーとする辞書として返すヘルパー関数"""
-    return {cat['id']: cat for cat in app_state['dictionary']['categories']}
+    return app_state['store'].categories_by_id
 
 def populate_category_hierarchy_treeview(tree_widget):
     """カテゴリ階層Treeviewにデータをロードする関数"""
@@ -635,16 +3125,14 @@ def populate_category_hierarchy_treeview(tree_widget):
         
         # このカテゴリに直接属するタグを子として挿入
         for tag in category_info.get('tags', []):
-            tree_widget.insert(iid, "end", text=f"  - {tag['en']} ({tag.get('ja', '説明なし')})", values=("tag",))
+            tree_widget.insert(iid, "end", text=f"  - {tag['en']} ({tag.get('ja') or '説明なし'})", values=("tag",))
 
-        # このカテゴリの子カテゴリを検索し、再帰的に挿入
-        children_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == category_info['id']]
-        for child_cat in children_categories:
+        # このカテゴリの子カテゴリを再帰的に挿入
+        for child_cat in app_state['store'].get_children(category_info['id']):
             insert_category_into_tree(child_cat, iid)
 
     # トップレベルカテゴリ（parent_idがNoneのカテゴリ）を挿入
-    top_level_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') is None]
-    for category in top_level_categories:
+    for category in app_state['store'].get_children(None):
         insert_category_into_tree(category)
 
 def show_category_tree_context_menu(event, tree_widget, name_entry_widget, parent_combobox_widget, notebook_widget, target_tab_frame):
@@ -681,8 +3169,7 @@ def delete_category(category_id, category_name):
         return
 
     # 子カテゴリの存在チェック
-    children_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == category_id]
-    if children_categories:
+    if app_state['store'].get_children(category_id):
         messagebox.showwarning("警告", f"カテゴリ '{category_name}' には子カテゴリが存在するため削除できません。\n先に子カテゴリを削除してください。")
         return
 
@@ -692,10 +3179,8 @@ def delete_category(category_id, category_name):
         return
 
     if messagebox.askyesno("確認", f"カテゴリ '{category_name}' を本当に削除しますか？\nこの操作は元に戻せません。"):
-        app_state['dictionary']['categories'] = [
-            cat for cat in app_state['dictionary']['categories'] if cat['id'] != category_id
-        ]
-        save_dictionary()
+        remove_category(category_id)
+        commit_changes()
         messagebox.showinfo("情報", f"カテゴリ '{category_name}' を削除しました。")
         update_category_dropdowns()
         populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get())
@@ -734,6 +3219,7 @@ def create_file_management_tab(notebook_frame):
     ttk.Button(inner_json_frame, text="現在の辞書JSONをダウンロード", command=download_dictionary_file).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
     ttk.Button(inner_json_frame, text="デモ用初期辞書を生成", command=generate_initial_dictionary).grid(row=0, column=2, padx=5, pady=5, sticky="ew")
     ttk.Button(inner_json_frame, text="追加辞書JSONをインポート (マージ)", command=import_additional_dictionary_json).grid(row=1, column=0, columnspan=3, padx=5, pady=5, sticky="ew")
+    ttk.Button(inner_json_frame, text="英語タグ名の重複を確認", command=report_duplicate_tags).grid(row=2, column=0, columnspan=3, padx=5, pady=5, sticky="ew")
 
     # 日本語説明の一括追加・更新 (CSV関連)
     bulk_ja_frame = ttk.LabelFrame(file_operations_group_frame, text="日本語説明の一括追加・更新 (CSV)", padding="10")
@@ -890,8 +3376,9 @@ def create_manage_dictionary_tab(notebook_frame):
             editor.set(current_value)
             def on_combobox_select(event):
                 new_value = editor.get()
-                app_state['edited_dict_df'].loc[row_index, columns[column_index]] = new_value
-                dict_tree.item(item_id, values=list(app_state['edited_dict_df'].loc[row_index][["英語タグ名", "日本語説明", "カテゴリ"]]))
+                app_state['edited_dict_table'].set_value(row_index, columns[column_index], new_value)
+                dict_tree.item(item_id, values=app_state['edited_dict_table'].row_values(row_index, TAG_TABLE_COLUMNS))
+                update_save_dict_changes_button()
                 editor.destroy()
                 # コンボボックス選択後にフォーカスをTreeviewに戻す
                 dict_tree.focus_set()
@@ -902,8 +3389,9 @@ def create_manage_dictionary_tab(notebook_frame):
             editor.insert(0, current_value)
             def on_entry_return(event):
                 new_value = editor.get().strip() # stripを適用
-                app_state['edited_dict_df'].loc[row_index, columns[column_index]] = new_value
-                dict_tree.item(item_id, values=list(app_state['edited_dict_df'].loc[row_index][["英語タグ名", "日本語説明", "カテゴリ"]]))
+                app_state['edited_dict_table'].set_value(row_index, columns[column_index], new_value)
+                dict_tree.item(item_id, values=app_state['edited_dict_table'].row_values(row_index, TAG_TABLE_COLUMNS))
+                update_save_dict_changes_button()
                 editor.destroy()
                 # エンターキー押下後にフォーカスをTreeviewに戻す
                 dict_tree.focus_set()
@@ -952,7 +3440,9 @@ def create_manage_dictionary_tab(notebook_frame):
     save_delete_buttons_frame = ttk.Frame(edit_frame, padding="5")
     save_delete_buttons_frame.pack(fill=tk.X, pady=5)
 
-    ttk.Button(save_delete_buttons_frame, text="タグの変更を保存", command=save_dict_changes).pack(side="left", expand=True, padx=5)
+    global save_dict_changes_button
+    save_dict_changes_button = ttk.Button(save_delete_buttons_frame, text="タグの変更を保存", command=save_dict_changes)
+    save_dict_changes_button.pack(side="left", expand=True, padx=5)
     ttk.Button(save_delete_buttons_frame, text="選択したタグを削除", command=delete_selected_tags).pack(side="left", expand=True, padx=5)
     
     # 初期ロードはmain関数で行う
@@ -972,24 +3462,16 @@ def delete_selected_tags():
     deleted_count = 0
     tags_to_delete_en = {dict_tree.item(item, 'values')[0] for item in selected_items} # 選択されたアイテムの英語タグ名を取得
 
-    # 新しい辞書構造を構築し、削除対象のタグを含めない
-    new_dictionary_structure = {"categories": []}
-    for category in app_state['dictionary'].get('categories', []):
-        new_category = {
-            "id": category['id'],
-            "name": category['name'],
-            "parent_id": category.get('parent_id'),
-            "tags": []
-        }
-        for tag in category.get('tags', []):
-            if tag['en'] not in tags_to_delete_en:
-                new_category['tags'].append(tag)
-            else:
-                deleted_count += 1
-        new_dictionary_structure['categories'].append(new_category)
+    # 削除対象のタグを索引からカテゴリごとにまとめ、削除したタグだけを保存先と検索インデックスに反映する
+    # (英語タグ名は保存先と同じく大文字小文字を区別せずに比べる)
+    tags_to_remove_by_category = {}
+    for tag_en in tags_to_delete_en:
+        for category, tag in app_state['store'].find_all_tags(tag_en):
+            tags_to_remove_by_category.setdefault(id(category), (category, {}))[1][id(tag)] = tag
+    for category, tags_to_remove in tags_to_remove_by_category.values():
+        deleted_count += len(remove_tags(category, list(tags_to_remove.values())))
 
-    app_state['dictionary'] = new_dictionary_structure
-    save_dictionary()
+    commit_changes()
     messagebox.showinfo("情報", f"{deleted_count}件のタグを辞書から削除しました。")
     populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get()) # Treeviewを更新
     update_category_dropdowns() # ドロップダウンリストを更新
@@ -1000,20 +3482,13 @@ def delete_selected_tags():
 
 def export_all_tags_to_csv():
     """辞書内の全てのタグを英語タグ名と日本語説明のCSVでエクスポートする"""
-    all_tags_for_export = []
-    for category in app_state['dictionary'].get('categories', []):
-        for tag in category.get('tags', []):
-            all_tags_for_export.append({
-                "English Tag": tag.get('en', ''),
-                "日本語説明": tag.get('ja', '')
-            })
-    
-    if not all_tags_for_export:
+    # タグの列形式の表から辞書順の列をまとめて取り出す
+    tag_columns = get_tag_columns()
+    rows = tag_columns.get_rows_in_category_order()
+    if not len(rows):
         messagebox.showinfo("情報", "エクスポートするタグがありません。")
         return
 
-    export_df = pd.DataFrame(all_tags_for_export)
-
     filepath = filedialog.asksaveasfilename(
         defaultextension=".csv",
         filetypes=[("CSVファイル", "*.csv")],
@@ -1021,52 +3496,44 @@ def export_all_tags_to_csv():
     )
     if filepath:
         try:
-            export_df.to_csv(filepath, index=False, encoding='utf-8-sig') # Excelで開けるようにutf-8-sig
-            messagebox.showinfo("情報", f"全タグ ({len(all_tags_for_export)}件) をCSVでエクスポートしました。")
+            with open(filepath, 'w', encoding='utf-8-sig', newline='') as f: # Excelで開けるようにutf-8-sig
+                writer = csv.writer(f, lineterminator=os.linesep)
+                writer.writerow(["English Tag", "日本語説明"])
+                writer.writerows(zip(tag_columns.get_values(rows, 'en'), tag_columns.get_values(rows, 'ja')))
+            messagebox.showinfo("情報", f"全タグ ({len(rows)}件) をCSVでエクスポートしました。")
         except Exception as e:
             messagebox.showerror("エラー", f"ファイルの保存中にエラーが発生しました: {e}")
 
 
 def populate_dict_treeview(search_query="", filter_category_path="--全てのカテゴリ--"):
     """辞書管理タブのTreeviewにデータをロードする (検索・フィルタ機能付き)"""
-    all_tags_data = []
     search_query_lower = search_query.lower()
     filter_category_id = all_category_path_to_id.get(filter_category_path)
+    tag_columns = get_tag_columns()
 
-    for category in app_state['dictionary'].get('categories', []):
-        category_path = get_category_path(category['id'])
-        
-        is_under_filter = False
-        if filter_category_id is None or filter_category_path == "--全てのカテゴリ--":
-            is_under_filter = True
-        else:
-            # 現在のカテゴリがフィルタカテゴリの子孫であるか、またはフィルタカテゴリ自体であるかをチェック
-            current_cat_id = category['id']
-            while current_cat_id:
-                if current_cat_id == filter_category_id:
-                    is_under_filter = True
-                    break
-                parent_cat = find_category_by_id(current_cat_id)
-                current_cat_id = parent_cat.get('parent_id') if parent_cat else None
-        
-        if is_under_filter:
-            for tag in category.get('tags', []):
-                tag_en = tag.get('en', '')
-                tag_ja = tag.get('ja', '')
-                
-                # 検索クエリでフィルタリング
-                if search_query_lower in tag_en.lower() or search_query_lower in tag_ja.lower():
-                    all_tags_data.append({
-                        "英語タグ名": tag_en,
-                        "日本語説明": tag_ja,
-                        "カテゴリ": category_path,
-                        "_category_id": tag.get('id', '')
-                    })
-    app_state['edited_dict_df'] = pd.DataFrame(all_tags_data, columns=["英語タグ名", "日本語説明", "カテゴリ", "_category_id"])
-    app_state['edited_dict_df'] = app_state['edited_dict_df'].fillna('')
+    if not search_query_lower:
+        rows = tag_columns.get_rows_in_category_order()
+    elif get_tag_index()['en_substrings'] is None:
+        # 部分文字列インデックスの用意ができるまでは列全体への配列演算で探す
+        rows = tag_columns.filter_containing(tag_columns.get_live_rows(), search_query_lower)
+    else:
+        # 検索クエリがある場合は部分文字列インデックスからヒットしたタグだけを対象にする
+        rows = [tag.row for _, _, tag in search_dictionary_tags(search_query_lower)]
+
+    # フィルタカテゴリ自体とその子孫のタグだけに絞り込む
+    if filter_category_id is not None and filter_category_path != "--全てのカテゴリ--":
+        rows = tag_columns.filter_subtree(rows, app_state['store'], filter_category_id)
+
+    app_state['edited_dict_table'] = RowTable.from_columns(DICT_TABLE_COLUMNS, [
+        tag_columns.get_values(rows, 'en'),
+        tag_columns.get_values(rows, 'ja'),
+        tag_columns.get_values(rows, 'category_path'),
+        [''] * len(rows)
+    ])
     # dict_treeがNoneでないことを確認
     if dict_tree is not None:
-        update_treeview(dict_tree, app_state['edited_dict_df'][["英語タグ名", "日本語説明", "カテゴリ"]])
+        update_treeview(dict_tree, app_state['edited_dict_table'], TAG_TABLE_COLUMNS)
+    update_save_dict_changes_button()
 
 def apply_selected_category_dict_tab():
     """辞書管理タブで選択したタグにカテゴリを一括適用する"""
@@ -1081,36 +3548,33 @@ def apply_selected_category_dict_tab():
         return
 
     selected_indices = [int(item) for item in selected_items]
-    app_state['edited_dict_df'].loc[selected_indices, 'カテゴリ'] = selected_category_path
-    
     for index in selected_indices:
-        dict_tree.item(index, values=list(app_state['edited_dict_df'].loc[index][["英語タグ名", "日本語説明", "カテゴリ"]]))
+        app_state['edited_dict_table'].set_value(index, 'カテゴリ', selected_category_path)
+        dict_tree.item(index, values=app_state['edited_dict_table'].row_values(index, TAG_TABLE_COLUMNS))
+    update_save_dict_changes_button()
     
     messagebox.showinfo("情報", f"{len(selected_indices)}件のタグにカテゴリ '{selected_category_path}' を適用しました。変更を保存するには「タグの変更を保存」ボタンを押してください。")
 
+def update_save_dict_changes_button():
+    """辞書管理タブの未保存の行数を「タグの変更を保存」ボタンに表示する関数"""
+    if save_dict_changes_button is None:
+        return
+    pending_count = len(app_state['edited_dict_table'].dirty_rows)
+    save_dict_changes_button.config(text=f"タグの変更を保存 ({pending_count}件)" if pending_count else "タグの変更を保存")
+
 def save_dict_changes():
     """辞書管理タブでの変更を辞書データに反映し保存する"""
-    if app_state['edited_dict_df'].empty and not app_state['dictionary'].get('categories'):
+    edited_table = app_state['edited_dict_table']
+    # 編集された行だけを辞書に反映する
+    if not edited_table.dirty_rows:
         messagebox.showwarning("警告", "保存する変更がありません。")
         return
 
-    # 現在の辞書データをディープコピーして、タグ情報を操作するためのフラットなマップを作成
-    # {english_tag_lower: {'en': '...', 'ja': '...', 'category_id': '...'}}
-    all_tags_flat = {}
-    for category in app_state['dictionary'].get('categories', []):
-        for tag in category.get('tags', []):
-            all_tags_flat[tag['en'].lower()] = {
-                'en': tag['en'],
-                'ja': tag.get('ja', ''), # ここは読み込んだまま
-                'category_id': category['id']
-            }
-
     updated_count = 0
     added_count = 0
 
-    # edited_dict_df の内容で all_tags_flat を更新
-    # edited_dict_df にあるタグは、元の辞書から更新されたもの、または新規追加されたもの
-    for index, row in app_state['edited_dict_df'].iterrows():
+    for index in sorted(edited_table.dirty_rows):
+        row = edited_table.rows[index]
         tag_en = row["英語タグ名"]
         tag_ja = row["日本語説明"].strip() # stripを適用
         category_path = row["カテゴリ"]
@@ -1120,50 +3584,24 @@ def save_dict_changes():
             messagebox.showwarning("警告", f"タグ '{tag_en}': 無効なカテゴリパス '{category_path}' です。このタグは保存されません。")
             continue
 
-        if tag_en.lower() in all_tags_flat:
-            # 既存のタグを更新
-            existing_tag_info = all_tags_flat[tag_en.lower()]
-            # 変更があった場合のみ更新カウント (比較時もstripを適用)
-            if existing_tag_info['ja'].strip() != tag_ja: # 比較時もstripを適用
-                existing_tag_info['ja'] = tag_ja
-                updated_count += 1
-        else:
-            # 新規タグを追加
-            all_tags_flat[tag_en.lower()] = {
-                'en': tag_en,
-                'ja': tag_ja,
-                'category_id': category_id
-            }
+        category = find_category_by_id(category_id)
+        if category is None:
+            messagebox.showwarning("警告", f"タグ '{tag_en}' の追加に失敗しました: 指定されたカテゴリが見つかりません。")
+            continue
+        # 辞書のどこかにあるタグは更新し、なければ新規タグとして追加する (変更があった場合のみ更新カウント)
+        _, _, status = upsert_tag(category, tag_en, tag_ja)
+        if status == 'added':
             added_count += 1
+        elif status == 'updated':
+            updated_count += 1
 
-    # 新しい辞書構造を再構築
-    # カテゴリ構造は既存のものを維持し、タグを再割り当て
-    new_dictionary_structure = {"categories": []}
-    for category in app_state['dictionary'].get('categories', []):
-        new_dictionary_structure['categories'].append({
-            "id": category['id'],
-            "name": category['name'],
-            "parent_id": category.get('parent_id'),
-            "tags": [] # ここは空にして、後でフラットなリストから追加
-        })
-
-    # フラットなタグリストから、正しいカテゴリにタグを割り当てる
-    for tag_key, tag_info in all_tags_flat.items():
-        target_category_id = tag_info['category_id']
-        target_category_in_new_dict = find_category_by_id(target_category_id, new_dictionary_structure['categories'])
-        if target_category_in_new_dict:
-            target_category_in_new_dict['tags'].append({"en": tag_info['en'], "ja": tag_info['ja']})
-        else:
-            # これが発生する場合、カテゴリが削除されたか、無効なカテゴリIDがタグに割り当てられた
-            # このケースは本来発生しないはずだが、念のため警告
-            messagebox.showwarning("警告", f"タグ '{tag_info['en']}' のカテゴリID '{target_category_id}' が見つかりませんでした。このタグは保存されません。")
-
-
-    app_state['dictionary'] = new_dictionary_structure
-    save_dictionary()
+    edited_table.dirty_rows.clear()
+    update_save_dict_changes_button()
+    if not commit_changes():
+        messagebox.showinfo("情報", "辞書に反映する変更はありませんでした。")
+        return
     messagebox.showinfo("情報", f"タグの変更を保存しました。更新されたタグ: {updated_count}件, 新規追加タグ: {added_count}件")
-    populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get()) # フィルタを維持して更新
-    update_category_dropdowns()
+    # 辞書管理タブの行は編集内容をすでに表示しているため再描画しない
     update_available_tags_treeview() # タグセット生成タブも更新
     populate_category_hierarchy_treeview(category_hierarchy_tree_manage) # 辞書管理タブの階層Treeviewを更新
     populate_category_hierarchy_treeview(category_hierarchy_tree_classify) # 分類タブの階層Treeviewも更新
@@ -1173,13 +3611,8 @@ def upload_dictionary_file():
     filepath = filedialog.askopenfilename(title="辞書JSONファイルを選択", filetypes=[("JSONファイル", "*.json")])
     if filepath:
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                app_state['dictionary'] = json.load(f)
-            # 読み込み時に全てのタグの日本語説明をstripする
-            for category in app_state['dictionary'].get('categories', []):
-                for tag in category.get('tags', []):
-                    if 'ja' in tag and tag['ja'] is not None:
-                        tag['ja'] = tag['ja'].strip()
+            set_dictionary(read_dictionary_file_streaming(filepath), background_index=True)
+            install_tag_index_when_ready()
             save_dictionary()
             messagebox.showinfo("情報", "辞書ファイルを読み込みました。")
             populate_dict_treeview()
@@ -1203,20 +3636,18 @@ def download_dictionary_file():
     )
     if filepath:
         try:
+            # 保存待ちの変更を辞書ファイルにも反映してから書き出す
+            get_dictionary_storage().flush()
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(app_state['dictionary'], f, ensure_ascii=False, indent=4)
+                json.dump(snapshot_dictionary(app_state['dictionary']), f, ensure_ascii=False, indent=4)
             messagebox.showinfo("情報", "辞書データをダウンロードしました。")
         except Exception as e:
             messagebox.showerror("エラー", f"ファイルの保存中にエラーが発生しました: {e}")
 
 def export_tags_without_ja():
     """日本語説明がないタグをエクスポートする"""
-    tags_without_ja = [
-        tag['en']
-        for category in app_state['dictionary'].get('categories', [])
-        for tag in category.get('tags', [])
-        if not tag.get('ja') or tag.get('ja') == '説明なし'
-    ]
+    tag_columns = get_tag_columns()
+    tags_without_ja = tag_columns.get_values(tag_columns.filter_without_ja(tag_columns.get_rows_in_category_order()), 'en')
 
     if not tags_without_ja:
         messagebox.showinfo("情報", "日本語説明がないタグはありません。")
@@ -1235,6 +3666,17 @@ def export_tags_without_ja():
         except Exception as e:
             messagebox.showerror("エラー", f"ファイルの保存中にエラーが発生しました: {e}")
 
+def report_duplicate_tags():
+    """英語タグ名 (大文字小文字を区別しない) が辞書内で重複しているタグを表示する"""
+    duplicates = app_state['store'].find_duplicate_tags()
+    if not duplicates:
+        messagebox.showinfo("情報", "英語タグ名が重複しているタグはありません。")
+        return
+    lines = [f"'{entries[0][1].en}': " + ", ".join(get_category_path(category['id']) for category, _ in entries)
+             for entries in duplicates[:20]]
+    messagebox.showwarning("警告", f"英語タグ名が重複しているタグが{len(duplicates)}件あります (タグ: カテゴリ)。\n"
+                           + "\n".join(lines) + (f"\n...ほか{len(duplicates) - 20}件" if len(duplicates) > 20 else ""))
+
 def import_translated_tags():
     """
     翻訳済みタグをインポートする関数。
@@ -1245,6 +3687,7 @@ def import_translated_tags():
         return
 
     try:
+        import pandas as pd # CSVの読み込み時だけ読み込む
         translated_df = pd.read_csv(filepath)
         if 'English Tag' not in translated_df.columns or '日本語説明' not in translated_df.columns:
             messagebox.showerror("エラー", "CSVファイルには 'English Tag' と '日本語説明' の列が必要です。")
@@ -1253,27 +3696,24 @@ def import_translated_tags():
         update_count = 0
         not_found_count = 0
 
-        # 現在の辞書のタグを効率的にルックアップできるように、英語タグ名をキーとする辞書を作成
-        current_tags_map = {}
-        for category in app_state['dictionary'].get('categories', []):
-            for tag in category.get('tags', []):
-                current_tags_map[tag['en'].lower()] = tag # 小文字化した英語タグ名をキーに
+        english_tags = translated_df['English Tag'].astype(str).str.strip().tolist()
+        japanese_descriptions = translated_df['日本語説明'].astype(str).str.strip().tolist() # stripを適用
+        # 英語タグ名とタグの列形式の表の行をまとめて突き合わせる
+        tag_columns = get_tag_columns()
+        matched_rows = tag_columns.join_en(english_tags)
 
-        for index, row in translated_df.iterrows():
-            english_tag = str(row['English Tag']).strip()
-            japanese_description = str(row['日本語説明']).strip() # stripを適用
-
-            if english_tag.lower() in current_tags_map:
+        for english_tag, japanese_description, row in zip(english_tags, japanese_descriptions, matched_rows):
+            if row >= 0:
                 # 既存のタグが見つかった場合、日本語説明を上書き (stripを適用)
-                existing_tag_obj = current_tags_map[english_tag.lower()]
-                if existing_tag_obj['ja'].strip() != japanese_description: # 比較時もstripを適用
-                    existing_tag_obj['ja'] = japanese_description
+                existing_tag_obj = tag_columns.records[row]
+                if (existing_tag_obj.ja or '').strip() != japanese_description: # 比較時もstripを適用
+                    set_tag_ja(existing_tag_obj.category_id, existing_tag_obj, japanese_description)
                     update_count += 1
             else:
                 not_found_count += 1
                 print(f"辞書にタグ '{english_tag}' が見つかりませんでした。このタグの日本語説明は更新されません。")
         
-        save_dictionary()
+        commit_changes()
         messagebox.showinfo("情報", 
                             f"翻訳済みタグのインポートが完了しました。\n"
                             f"更新: {update_count}件\n"
@@ -1293,179 +3733,129 @@ def import_additional_dictionary_json():
     if not filepath:
         return
 
+    added_categories_count = 0
+    added_tags_count = 0
+    updated_tags_count = 0
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            imported_data = json.load(f)
-        
-        if 'categories' not in imported_data:
-            messagebox.showerror("エラー", "インポートするJSONファイルは 'categories' キーを持つ必要があります。")
-            return
-
-        added_categories_count = 0
-        added_tags_count = 0
-        updated_tags_count = 0
-
-        # --- 現在の辞書の状態を効率的にルックアップできるように準備 ---
-        # (カテゴリ名.lower(), parent_id) -> カテゴリオブジェクト のマップ
-        current_category_name_parent_map = {} 
-        # 英語タグ名(小文字) -> タグオブジェクト のマップ
-        current_tag_en_lower_to_obj = {} 
-
-        # Populate current maps
-        for cat in app_state['dictionary'].get('categories', []):
-            parent_id = cat.get('parent_id')
-            current_category_name_parent_map[(cat['name'].lower(), parent_id)] = cat
-            for tag in cat.get('tags', []):
-                current_tag_en_lower_to_obj[tag['en'].lower()] = tag
+        # 現在の辞書のカテゴリ・タグは索引から引く (追加したカテゴリ・タグも索引に登録される)
+        store = app_state['store']
 
         # --- インポートされる辞書内のカテゴリIDを、マージ後の辞書のIDにマッピングするための準備 ---
         # imported_cat_id -> current_cat_id (または新しく生成されたID)
         imported_id_to_final_id = {} 
-        # imported_cat_id -> imported_cat_object
-        imported_categories_by_id = {c['id']: c for c in imported_data['categories']}
-        
-        # 処理済みのインポートカテゴリIDを追跡
-        processed_imported_category_ids = set()
-        # 未処理のインポートカテゴリリストを初期化
-        unprocessed_imported_categories = list(imported_data['categories'])
-
-        # --- カテゴリのマージ (親カテゴリが先に処理されるように反復処理) ---
-        # 最大ループ回数を設定し、無限ループを防ぐ
-        max_iterations = len(imported_data['categories']) * 2 # Safety break
-        iteration_count = 0
-
-        while len(processed_imported_category_ids) < len(imported_data['categories']) and iteration_count < max_iterations:
-            iteration_count += 1
-            categories_processed_in_this_iteration = []
-
-            # 未処理のカテゴリリストのコピーをイテレート
-            for imported_cat in list(unprocessed_imported_categories):
-                if imported_cat['id'] in processed_imported_category_ids:
-                    continue # 既に処理済み
-
-                imported_parent_id = imported_cat.get('parent_id')
-                imported_cat_name = imported_cat['name']
-
-                resolved_parent_id_in_main_dict = None
-                can_process_category = False
-
-                if imported_parent_id is None: # Top-level category in imported file
-                    can_process_category = True
-                    resolved_parent_id_in_main_dict = None
-                elif imported_parent_id == "general": # Special "general" parent
-                    # Try to find "general" category in current dictionary
-                    general_cat_obj = current_category_name_parent_map.get(("general", None))
-                    if general_cat_obj:
-                        resolved_parent_id_in_main_dict = general_cat_obj['id']
-                        can_process_category = True
-                    else:
-                        # If "general" doesn't exist, treat this imported category as a new top-level
-                        resolved_parent_id_in_main_dict = None
-                        can_process_category = True
-                elif imported_parent_id in imported_id_to_final_id: # Parent was processed in this import session
-                    resolved_parent_id_in_main_dict = imported_id_to_final_id[imported_parent_id]
-                    can_process_category = True
-                else:
-                    # Check if parent exists in the main dictionary already
-                    existing_parent_in_main_dict = find_category_by_id(imported_parent_id, app_state['dictionary']['categories'])
-                    if existing_parent_in_main_dict:
-                        resolved_parent_id_in_main_dict = existing_parent_in_main_dict['id']
-                        can_process_category = True
-                    else:
-                        # Parent not found in main dictionary or in current import session.
-                        # Treat this imported category as a new top-level category and issue a warning.
-                        messagebox.showwarning("警告", f"インポートされたカテゴリ '{imported_cat_name}' の親カテゴリID '{imported_parent_id}' が見つかりませんでした。このカテゴリはトップレベルカテゴリとして追加されます。")
-                        resolved_parent_id_in_main_dict = None
-                        can_process_category = True # Can process now, as it's top-level
-
-                if can_process_category:
-                    # Check if this category (by name and resolved parent) already exists in the main dictionary
-                    existing_cat_obj = current_category_name_parent_map.get((imported_cat_name.lower(), resolved_parent_id_in_main_dict))
-
-                    if existing_cat_obj:
-                        # Category already exists, reuse it
-                        final_cat_id = existing_cat_obj['id']
-                        imported_id_to_final_id[imported_cat['id']] = final_cat_id
-                    else:
-                        # New category, add it
-                        final_cat_id = str(uuid.uuid4())
-                        new_category_obj = {
-                            "id": final_cat_id,
-                            "name": imported_cat_name,
-                            "parent_id": resolved_parent_id_in_main_dict,
-                            "tags": [] # Tags will be added later
-                        }
-                        app_state['dictionary']['categories'].append(new_category_obj)
-                        current_category_name_parent_map[(imported_cat_name.lower(), resolved_parent_id_in_main_dict)] = new_category_obj
-                        imported_id_to_final_id[imported_cat['id']] = final_cat_id
-                        added_categories_count += 1
-                    
-                    categories_processed_in_this_iteration.append(imported_cat)
-                    processed_imported_category_ids.add(imported_cat['id']) # ここで処理済みとしてマーク
-
-            # このイテレーションで処理されたカテゴリを未処理リストから削除
-            unprocessed_imported_categories = [cat for cat in unprocessed_imported_categories if cat['id'] not in processed_imported_category_ids]
-
-            if not categories_processed_in_this_iteration and unprocessed_imported_categories:
-                # このイテレーションで何も処理されなかったが、まだ未処理のカテゴリが残っている場合
-                # これは解決できない依存関係（例：循環参照）を示唆している可能性が高い
-                messagebox.showwarning("警告", "インポートするカテゴリ階層に解決できない依存関係があるか、親カテゴリが見つかりません。一部のカテゴリがインポートされない可能性があります。")
-                break # 無限ループを防ぐためにループを抜ける
-
-        # --- タグのマージ (全てのカテゴリがマッピングされた後) ---
-        for imported_cat in imported_data['categories']:
-            # Get the corresponding category object in the main dictionary
-            target_current_cat_id = imported_id_to_final_id.get(imported_cat['id'])
-            if not target_current_cat_id:
-                # This imported category was not successfully processed, skip its tags
-                continue 
-            
-            target_category_obj = None
-            # Find the actual category object in the main dictionary using its final ID
-            for cat in app_state['dictionary']['categories']:
-                if cat['id'] == target_current_cat_id:
-                    target_category_obj = cat
-                    break
-            
-            if not target_category_obj:
-                # Should not happen if target_current_cat_id exists in map
-                continue
+        # 親カテゴリがまだ現れていないカテゴリの待ち行列: imported_parent_id -> [imported_cat_object]
+        deferred_by_parent_id = {}
+
+        def merge_category(imported_cat, resolved_parent_id_in_main_dict):
+            """親カテゴリが確定したインポートカテゴリとそのタグを辞書にマージする"""
+            nonlocal added_categories_count, added_tags_count, updated_tags_count
+            imported_cat_name = imported_cat['name']
+            # Check if this category (by name and resolved parent) already exists in the main dictionary
+            target_category_obj = store.find_child_by_name(resolved_parent_id_in_main_dict, imported_cat_name)
+            if target_category_obj is None:
+                # New category, add it
+                target_category_obj = {
+                    "id": str(uuid.uuid4()),
+                    "name": imported_cat_name,
+                    "parent_id": resolved_parent_id_in_main_dict,
+                    "tags": []
+                }
+                insert_category(target_category_obj)
+                added_categories_count += 1
+            imported_id_to_final_id[imported_cat['id']] = target_category_obj['id']
 
             for imported_tag in imported_cat.get('tags', []):
-                imported_tag_en_lower = imported_tag['en'].lower()
-                imported_tag_ja = imported_tag.get('ja', '').strip() # stripを適用
-
-                if imported_tag_en_lower in current_tag_en_lower_to_obj:
-                    # 既存のタグが見つかった場合、日本語説明を更新 (比較時もstripを適用)
-                    existing_tag_obj = current_tag_en_lower_to_obj[imported_tag_en_lower]
-                    if existing_tag_obj['ja'].strip() != imported_tag_ja: # 比較時もstripを適用
-                        existing_tag_obj['ja'] = imported_tag_ja
-                        updated_tags_count += 1
-                else:
-                    # 新規タグとして追加 (stripを適用)
-                    new_tag = {"en": imported_tag['en'], "ja": imported_tag_ja}
-                    target_category_obj.setdefault('tags', []).append(new_tag)
-                    current_tag_en_lower_to_obj[imported_tag_en_lower] = new_tag # Add to map for future checks
+                imported_tag_ja = (imported_tag.get('ja') or '').strip() # stripを適用
+
+                # 辞書のどこかに既存のタグがあれば日本語説明を更新し、なければ新規タグとして追加 (検索インデックスにも登録される)
+                _, _, status = upsert_tag(target_category_obj, imported_tag['en'], imported_tag_ja)
+                if status == 'added':
                     added_tags_count += 1
+                elif status == 'updated':
+                    updated_tags_count += 1
+
+        def merge_with_deferred_children(imported_cat, resolved_parent_id_in_main_dict):
+            """カテゴリをマージし、その到着を待っていた子カテゴリも続けてマージする"""
+            pending = [(imported_cat, resolved_parent_id_in_main_dict)]
+            while pending:
+                category, parent_id = pending.pop()
+                merge_category(category, parent_id)
+                final_id = imported_id_to_final_id[category['id']]
+                for child in deferred_by_parent_id.pop(category['id'], []):
+                    pending.append((child, final_id))
+
+        # --- カテゴリとタグのマージ (カテゴリを1つずつ読み込みながら処理) ---
+        reader = StreamingCategoryReader(filepath)
+        for imported_cat in reader:
+            imported_parent_id = imported_cat.get('parent_id')
+
+            if imported_parent_id is None: # Top-level category in imported file
+                merge_with_deferred_children(imported_cat, None)
+            elif imported_parent_id == "general": # Special "general" parent
+                # Try to find "general" category in current dictionary
+                # If "general" doesn't exist, treat this imported category as a new top-level
+                general_cat_obj = store.find_child_by_name(None, "general")
+                merge_with_deferred_children(imported_cat, general_cat_obj['id'] if general_cat_obj else None)
+            elif imported_parent_id in imported_id_to_final_id: # Parent was processed in this import session
+                merge_with_deferred_children(imported_cat, imported_id_to_final_id[imported_parent_id])
+            elif store.get_category(imported_parent_id) is not None: # Parent exists in the main dictionary already
+                merge_with_deferred_children(imported_cat, imported_parent_id)
+            else:
+                # 親カテゴリがファイルの後方にある可能性があるため、親が現れるまで待たせる
+                deferred_by_parent_id.setdefault(imported_parent_id, []).append(imported_cat)
 
-        save_dictionary()
+        if not reader.found_categories:
+            messagebox.showerror("エラー", "インポートするJSONファイルは 'categories' キーを持つ必要があります。")
+            return
+
+        # 最後まで親カテゴリが見つからなかったカテゴリはトップレベルカテゴリとして追加する
+        # (親も待ち行列にあるカテゴリは、親の追加に続いて追加される)
+        orphan_names = []
+        deferred_ids = {cat['id'] for cats in deferred_by_parent_id.values() for cat in cats}
+        orphan_parent_ids = [parent_id for parent_id in deferred_by_parent_id if parent_id not in deferred_ids]
+        for imported_parent_id in orphan_parent_ids:
+            for imported_cat in deferred_by_parent_id.pop(imported_parent_id, []):
+                orphan_names.append(f"'{imported_cat['name']}' (親カテゴリID '{imported_parent_id}')")
+                merge_with_deferred_children(imported_cat, None)
+        # 循環参照で残ったカテゴリも同様にトップレベルカテゴリとして追加する
+        while deferred_by_parent_id:
+            imported_parent_id, orphans = deferred_by_parent_id.popitem()
+            for imported_cat in orphans:
+                orphan_names.append(f"'{imported_cat['name']}' (親カテゴリID '{imported_parent_id}')")
+                merge_with_deferred_children(imported_cat, None)
+        if orphan_names:
+            messagebox.showwarning("警告", "以下のインポートされたカテゴリの親カテゴリが見つかりませんでした。これらのカテゴリはトップレベルカテゴリとして追加されます。\n" + "\n".join(orphan_names[:20]) + (f"\n...ほか{len(orphan_names) - 20}件" if len(orphan_names) > 20 else ""))
+
+        commit_changes()
         messagebox.showinfo("インポート完了", 
                             f"追加辞書JSONのインポートが完了しました。\n"
                             f"追加されたカテゴリ: {added_categories_count}件\n"
                             f"追加されたタグ: {added_tags_count}件\n"
                             f"更新されたタグ: {updated_tags_count}件")
-        
-        # UIを更新
-        update_category_dropdowns()
-        populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get())
-        update_available_tags_treeview()
-        populate_category_hierarchy_treeview(category_hierarchy_tree_manage)
-        populate_category_hierarchy_treeview(category_hierarchy_tree_classify)
 
-    except json.JSONDecodeError:
-        messagebox.showerror("エラー", "選択されたファイルは有効なJSON形式ではありません。")
     except Exception as e:
-        messagebox.showerror("エラー", f"ファイルの読み込みまたは処理中にエラーが発生しました: {e}")
+        if isinstance(e, json.JSONDecodeError):
+            error_message = "選択されたファイルは有効なJSON形式ではありません。"
+        else:
+            error_message = f"ファイルの読み込みまたは処理中にエラーが発生しました: {e}"
+        if not (added_categories_count or added_tags_count or updated_tags_count):
+            messagebox.showerror("エラー", error_message)
+            return
+        # カテゴリを読み込みながらマージするため、エラーの直前までの内容は辞書に反映済み
+        commit_changes()
+        messagebox.showerror("エラー", 
+                             f"{error_message}\n"
+                             f"エラーの直前までの内容はマージされました。\n"
+                             f"追加されたカテゴリ: {added_categories_count}件\n"
+                             f"追加されたタグ: {added_tags_count}件\n"
+                             f"更新されたタグ: {updated_tags_count}件")
+
+    # UIを更新
+    update_category_dropdowns()
+    populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get())
+    update_available_tags_treeview()
+    populate_category_hierarchy_treeview(category_hierarchy_tree_manage)
+    populate_category_hierarchy_treeview(category_hierarchy_tree_classify)
 
 
 def create_classify_tags_tab(notebook_frame):
@@ -1573,8 +3963,8 @@ def create_classify_tags_tab(notebook_frame):
             editor.set(current_value)
             def on_combobox_select(event):
                 new_value = editor.get()
-                app_state['unclassified_df'].loc[row_index, columns[column_index]] = new_value
-                update_treeview(unclassified_tree, app_state['unclassified_df']) # DataFrame全体を更新してTreeviewを再描画
+                app_state['unclassified_table'].set_value(row_index, columns[column_index], new_value)
+                unclassified_tree.item(item_id, values=app_state['unclassified_table'].row_values(row_index)) # 編集した行だけを再描画
                 editor.destroy()
                 # コンボボックス選択後にフォーカスをTreeviewに戻す
                 unclassified_tree.focus_set()
@@ -1585,8 +3975,8 @@ def create_classify_tags_tab(notebook_frame):
             editor.insert(0, current_value)
             def on_entry_return(event):
                 new_value = editor.get().strip() # stripを適用
-                app_state['unclassified_df'].loc[row_index, columns[column_index]] = new_value
-                update_treeview(unclassified_tree, app_state['unclassified_df']) # DataFrame全体を更新してTreeviewを再描画
+                app_state['unclassified_table'].set_value(row_index, columns[column_index], new_value)
+                unclassified_tree.item(item_id, values=app_state['unclassified_table'].row_values(row_index)) # 編集した行だけを再描画
                 editor.destroy()
                 # エンターキー押下後にフォーカスをTreeviewに戻す
                 unclassified_tree.focus_set()
@@ -1617,43 +4007,21 @@ def create_classify_tags_tab(notebook_frame):
     return tab_frame
 
 def process_unclassified_tags(tags_list_cleaned):
-    """未分類タグリストを処理し、DataFrameを更新する共通関数"""
+    """未分類タグリストを処理し、未分類タグの表を更新する共通関数"""
     newly_unclassified = []
-    # 辞書内のすべてのタグを効率的にルックアップできるように、英語タグ名をキーとする辞書を作成
-    all_dict_tags_en_map = {t['en'].lower(): t for cat in app_state['dictionary'].get('categories', []) for t in cat.get('tags', [])}
+    store = app_state['store']
 
     for tag in tags_list_cleaned:
-        if tag.lower() in all_dict_tags_en_map:
-            # 既存のタグが見つかった場合、日本語説明を更新
-            existing_tag_obj = all_dict_tags_en_map[tag.lower()]
+        if store.find_tag(tag) is not None:
             # ここでは既存のタグの日本語説明を更新するロジックは含めない（分類タブの役割ではないため）
             print(f"タグ '{tag}' は既に辞書に存在します。スキップします。")
         else:
             newly_unclassified.append(tag)
 
-    unclassified_tags_data = []
-    for tag_en in newly_unclassified:
-        hints = get_classification_hint(tag_en)
-        suggested_ja = ""
-        suggested_cat_path = "--カテゴリを選択--"
-
-        if hints:
-            top_hint = hints[0]
-            # stripを適用
-            suggested_ja = (top_hint.get('tag_ja', '') if top_hint.get('tag_ja') != '説明なし' else '').strip()
-            suggested_cat_path = top_hint.get('category_path', '')
-
-        unclassified_tags_data.append({
-            "英語タグ名": tag_en,
-            "日本語説明": suggested_ja,
-            "カテゴリ": suggested_cat_path
-        })
-    
-    app_state['unclassified_df'] = pd.DataFrame(unclassified_tags_data, columns=["英語タグ名", "日本語説明", "カテゴリ"])
-    app_state['unclassified_df'] = app_state['unclassified_df'].fillna('')
-    update_treeview(unclassified_tree, app_state['unclassified_df'])
-    unclassified_status_label.config(text=f"未分類タグ ({len(app_state['unclassified_df'])}件):")
-    messagebox.showinfo("情報", f"{len(app_state['unclassified_df'])} 個の新しい未分類タグを読み込みました。")
+    app_state['unclassified_table'] = get_classification_hints_batch(newly_unclassified)
+    update_treeview(unclassified_tree, app_state['unclassified_table'])
+    unclassified_status_label.config(text=f"未分類タグ ({len(app_state['unclassified_table'])}件):")
+    messagebox.showinfo("情報", f"{len(app_state['unclassified_table'])} 個の新しい未分類タグを読み込みました。")
 
 
 def load_unclassified_tags_from_file_classify_tab():
@@ -1668,6 +4036,7 @@ def load_unclassified_tags_from_file_classify_tab():
     try:
         tags_list_cleaned = []
         if filepath.endswith('.csv'):
+            import pandas as pd # CSVの読み込み時だけ読み込む
             df_uploaded = pd.read_csv(filepath)
             if not df_uploaded.empty:
                 tags_list_cleaned = df_uploaded.iloc[:, 0].astype(str).tolist()
@@ -1717,9 +4086,9 @@ def apply_selected_category_unclassified_tab():
 
     selected_indices = [int(item) for item in selected_items]
 
-    app_state['unclassified_df'].loc[selected_indices, 'カテゴリ'] = selected_category_path
-    
-    update_treeview(unclassified_tree, app_state['unclassified_df'])
+    for index in selected_indices:
+        app_state['unclassified_table'].set_value(index, 'カテゴリ', selected_category_path)
+        unclassified_tree.item(index, values=app_state['unclassified_table'].row_values(index))
     
     messagebox.showinfo("情報", f"{len(selected_indices)}件のタグにカテゴリ '{selected_category_path}' を適用しました。")
 
@@ -1728,43 +4097,22 @@ def add_classified_tags_to_dictionary_unclassified_tab():
     added_count = 0
     updated_count = 0 # 更新されたタグのカウントを追加
     unclassified_after_add = []
-    
-    # 辞書内のすべてのタグを効率的にルックアップできるように、英語タグ名をキーとする辞書を作成
-    all_dict_tags_en_map = {}
-    for category in app_state['dictionary'].get('categories', []):
-        for tag in category.get('tags', []):
-            all_dict_tags_en_map[tag['en'].lower()] = tag
 
-    for index, row in app_state['unclassified_df'].iterrows():
+    for index, row in app_state['unclassified_table'].iter_rows():
         tag_en = row["英語タグ名"]
         tag_ja = row["日本語説明"].strip() # stripを適用
         category_path = row["カテゴリ"]
 
         if category_path and category_path != "--カテゴリを選択--":
-            category_id = get_category_id_from_path(category_path)
-            if category_id is not None:
-                if tag_en.lower() in all_dict_tags_en_map:
-                    # 既存のタグが見つかった場合、日本語説明を更新
-                    existing_tag_obj = all_dict_tags_en_map[tag_en.lower()]
-                    # カテゴリも更新できるように修正 (ただし、カテゴリ移動は慎重に)
-                    # ここでは、同じ英語タグ名であれば日本語説明を更新するのみとする
-                    if existing_tag_obj['ja'].strip() != tag_ja: # 比較時もstripを適用
-                        existing_tag_obj['ja'] = tag_ja
-                        updated_count += 1
-                else:
-                    # 新規タグとして追加
-                    success, message = add_tag_to_dictionary(tag_en, tag_ja, category_id)
-                    if success:
-                        added_count += 1
-                        # 新しく追加されたタグもマップに反映
-                        target_category = find_category_by_id(category_id)
-                        if target_category:
-                            new_tag_obj = next((t for t in target_category['tags'] if t['en'].lower() == tag_en.lower()), None)
-                            if new_tag_obj:
-                                all_dict_tags_en_map[tag_en.lower()] = new_tag_obj
-                    else:
-                        messagebox.showwarning("警告", f"タグ '{tag_en}' の追加に失敗しました: {message}")
-                        unclassified_after_add.append(tag_en)
+            category = find_category_by_id(get_category_id_from_path(category_path))
+            if category is not None:
+                # 既存のタグが見つかった場合は日本語説明を更新し、なければ新規タグとして追加
+                # (同じ英語タグ名であればカテゴリは移動せず、日本語説明を更新するのみとする)
+                _, _, status = upsert_tag(category, tag_en, tag_ja)
+                if status == 'added':
+                    added_count += 1
+                elif status == 'updated':
+                    updated_count += 1
             else:
                 messagebox.showwarning("警告", f"タグ '{tag_en}': 無効なカテゴリパス '{category_path}' です。スキップしました。")
                 unclassified_after_add.append(tag_en)
@@ -1772,37 +4120,21 @@ def add_classified_tags_to_dictionary_unclassified_tab():
             unclassified_after_add.append(tag_en)
 
     # 未分類のまま残ったタグを再処理
-    unclassified_tags_data = []
-    for tag_en in unclassified_after_add:
-        hints = get_classification_hint(tag_en)
-        suggested_ja = ""
-        suggested_cat_path = "--カテゴリを選択--"
-        if hints:
-            top_hint = hints[0]
-            suggested_ja = (top_hint.get('tag_ja', '') if top_hint.get('tag_ja') != '説明なし' else '').strip() # stripを適用
-            suggested_cat_path = top_hint.get('category_path', '')
-        unclassified_tags_data.append({
-            "英語タグ名": tag_en,
-            "日本語説明": suggested_ja,
-            "カテゴリ": suggested_cat_path
-        })
-    app_state['unclassified_df'] = pd.DataFrame(unclassified_tags_data, columns=["英語タグ名", "日本語説明", "カテゴリ"])
-    app_state['unclassified_df'] = app_state['unclassified_df'].fillna('')
-    update_treeview(unclassified_tree, app_state['unclassified_df'])
-    save_dictionary()
-    update_category_dropdowns()
+    app_state['unclassified_table'] = get_classification_hints_batch(unclassified_after_add)
+    update_treeview(unclassified_tree, app_state['unclassified_table'])
+    commit_changes()
     populate_dict_treeview(dict_search_entry.get(), dict_filter_var.get()) # フィルタを維持して更新
     update_available_tags_treeview() # タグセット生成タブも更新
     populate_category_hierarchy_treeview(category_hierarchy_tree_manage) # 辞書管理タブの階層Treeviewを更新
     populate_category_hierarchy_treeview(category_hierarchy_tree_classify) # 分類タブの階層Treeviewも更新
-    unclassified_status_label.config(text=f"未分類タグ ({len(app_state['unclassified_df'])}件):")
+    unclassified_status_label.config(text=f"未分類タグ ({len(app_state['unclassified_table'])}件):")
     messagebox.showinfo("情報", f"{added_count}件のタグを辞書に追加し、{updated_count}件のタグを更新しました。辞書ファイルも更新されました。")
 
 
 def clear_unclassified_tags_classify_tab():
     """未分類タグリストをクリアする（分類タブ用）"""
-    app_state['unclassified_df'] = pd.DataFrame(columns=["英語タグ名", "日本語説明", "カテゴリ"])
-    update_treeview(unclassified_tree, app_state['unclassified_df'])
+    app_state['unclassified_table'] = RowTable(TAG_TABLE_COLUMNS)
+    update_treeview(unclassified_tree, app_state['unclassified_table'])
     unclassified_status_label.config(text="未分類タグリストを読み込んでください。")
     messagebox.showinfo("情報", "未分類タグリストをクリアしました。")
 
@@ -1970,36 +4302,25 @@ def create_random_tag_gen_tab(notebook_frame):
 
 def get_leaf_categories(categories_list):
     """子カテゴリを持たない最終カテゴリのリストを返す"""
-    # カテゴリIDをキーとするマップを作成
-    category_id_map = {cat['id']: cat for cat in categories_list}
-    
-    # 全てのカテゴリのparent_idをセットに収集
-    all_parent_ids = {cat.get('parent_id') for cat in categories_list if cat.get('parent_id') is not None}
-    
-    leaf_categories = []
-    for category in categories_list:
-        # 自身のIDが他のカテゴリのparent_idとして存在しない場合、それはリーフカテゴリ
-        if category['id'] not in all_parent_ids:
-            leaf_categories.append(category)
-    return leaf_categories
-
-
-def check_if_category_or_descendant_matches_search(category_info, search_query_lower, all_categories_map):
-    """カテゴリまたはその子孫が検索クエリに一致するか再帰的にチェックする"""
-    # 現在のカテゴリ名が検索クエリに一致するか
-    if search_query_lower in category_info['name'].lower():
-        return True
-    # 現在のカテゴリのタグが検索クエリに一致するか
-    for tag in category_info.get('tags', []):
-        if search_query_lower in tag.get('en', '').lower() or \
-           search_query_lower in tag.get('ja', '').lower():
-            return True
-    # 子カテゴリを再帰的にチェック
-    children_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == category_info['id']]
-    for child_cat in children_categories:
-        if check_if_category_or_descendant_matches_search(child_cat, search_query_lower, all_categories_map):
-            return True
-    return False
+    store = app_state['store']
+    return [category for category in categories_list if not store.get_children(category['id'])]
+
+
+def find_categories_matching_search(search_query_lower):
+    """カテゴリ自体またはその子孫が検索クエリに一致するカテゴリのIDの集合を返す"""
+    store = app_state['store']
+    matching_ids = set()
+    for category in store.categories:
+        # カテゴリ名またはカテゴリのタグが検索クエリに一致するか
+        if search_query_lower in category['name'].lower() or any(
+                search_query_lower in tag.en_lower or search_query_lower in (tag.ja or '').lower()
+                for tag in category.get('tags', [])):
+            # 一致したカテゴリの祖先も一致として扱う (循環参照は途中で打ち切る)
+            current = category
+            while current is not None and current['id'] not in matching_ids:
+                matching_ids.add(current['id'])
+                current = store.get_category(current.get('parent_id'))
+    return matching_ids
 
 
 def populate_available_categories_treeview():
@@ -2008,22 +4329,21 @@ def populate_available_categories_treeview():
     for item in available_categories_tree.get_children():
         available_categories_tree.delete(item)
 
-    all_categories_map = get_all_categories_flat_map()
     search_query_lower = tag_gen_search_entry.get().lower() if tag_gen_search_entry is not None else ""
+    # 検索クエリがある場合は、カテゴリ自体または子孫が検索にヒットするカテゴリを先に求めておく
+    matching_ids = find_categories_matching_search(search_query_lower) if search_query_lower else None
 
     def insert_category_node(category_info, parent_iid=""):
         # 検索クエリがある場合、このカテゴリまたは子孫が検索にヒットしない場合はスキップ
-        if search_query_lower and not check_if_category_or_descendant_matches_search(category_info, search_query_lower, all_categories_map):
+        if matching_ids is not None and category_info['id'] not in matching_ids:
             return
 
         iid = available_categories_tree.insert(parent_iid, "end", text=f"📂 {category_info['name']}", open=False, values=(category_info['id'],))
         
-        children_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == category_info['id']]
-        for child_cat in children_categories:
+        for child_cat in app_state['store'].get_children(category_info['id']):
             insert_category_node(child_cat, iid)
 
-    top_level_categories = [cat for cat in app_state['dictionary'].get('categories', []) if cat.get('parent_id') is None]
-    for category in top_level_categories:
+    for category in app_state['store'].get_children(None):
         insert_category_node(category)
 
 def populate_available_tags_list_treeview(selected_category_id=None):
@@ -2032,50 +4352,23 @@ def populate_available_tags_list_treeview(selected_category_id=None):
     for item in available_tags_tree.get_children():
         available_tags_tree.delete(item)
 
-    all_tags_to_display = []
     # tag_list_search_entry から検索クエリを取得
     search_query_lower = tag_list_search_entry.get().lower() if tag_list_search_entry is not None else ""
+    tag_columns = get_tag_columns()
 
-    # 選択されたカテゴリとその子孫カテゴリのタグを再帰的に取得
-    def get_tags_recursively(cat_id):
-        current_category = find_category_by_id(cat_id)
-        if not current_category: return []
-        
-        tags = []
-        for tag in current_category.get('tags', []):
-            tags.append({
-                'en': tag['en'],
-                'ja': tag.get('ja', ''),
-                'category_path': get_category_path(current_category['id'])
-            })
-        
-        children_categories = [cat for cat in app_state['dictionary']['categories'] if cat.get('parent_id') == cat_id]
-        for child_cat in children_categories:
-            tags.extend(get_tags_recursively(child_cat['id']))
-        return tags
-    
     if selected_category_id:
-        all_tags_to_display = get_tags_recursively(selected_category_id)
+        # 選択されたカテゴリとその子孫カテゴリのタグを親から順に取得
+        rows = tag_columns.get_subtree_rows(app_state['store'], selected_category_id)
     else: # カテゴリが選択されていない場合、全てのタグを表示
-        for category in app_state['dictionary'].get('categories', []):
-            for tag in category.get('tags', []):
-                all_tags_to_display.append({
-                    'en': tag['en'],
-                    'ja': tag.get('ja', ''),
-                    'category_path': get_category_path(category['id'])
-                })
-
-    # 検索クエリでフィルタリング
-    filtered_tags = []
-    for tag_info in all_tags_to_display:
-        if search_query_lower in tag_info['en'].lower() or \
-           search_query_lower in tag_info['ja'].lower() or \
-           search_query_lower in tag_info['category_path'].lower():
-            filtered_tags.append(tag_info)
+        rows = tag_columns.get_rows_in_category_order()
+
+    # 検索クエリ (英語タグ名・日本語説明・カテゴリパス) でフィルタリング
+    rows = tag_columns.filter_containing(rows, search_query_lower, match_category_path=True)
 
     # フィルタリングされたタグをTreeviewに挿入
-    for index, tag_info in enumerate(filtered_tags):
-        available_tags_tree.insert("", "end", iid=index, values=(tag_info['en'], tag_info['ja'], tag_info['category_path']))
+    filtered_tags = zip(tag_columns.get_values(rows, 'en'), tag_columns.get_values(rows, 'ja'), tag_columns.get_values(rows, 'category_path'))
+    for index, values in enumerate(filtered_tags):
+        available_tags_tree.insert("", "end", iid=index, values=values)
 
 
 def on_available_category_select(event):
@@ -2149,12 +4442,10 @@ def update_selected_generating_treeview():
             "カテゴリ": tag_info.get('category_path', '')
         })
     
-    selected_df = pd.DataFrame(processed_selected_tags, columns=["英語タグ名", "日本語説明", "カテゴリ"])
-    selected_df = selected_df.fillna('')
     # selected_generating_treeがNoneでないことを確認
     if selected_generating_tree is not None:
         # Treeviewのクリアはupdate_treeview内で処理される
-        update_treeview(selected_generating_tree, selected_df)
+        update_treeview(selected_generating_tree, RowTable(TAG_TABLE_COLUMNS, processed_selected_tags))
 
 def remove_selected_generating_tag():
     """選択済みタグリストからタグを削除する"""
@@ -2164,7 +4455,7 @@ def remove_selected_generating_tag():
         messagebox.showwarning("警告", "削除するタグを選択してください。")
         return
     
-    # Treeviewのitem_idはDataFrameのindexと一致するようにしている
+    # Treeviewのitem_idは表の行番号と一致するようにしている
     row_index_to_remove = int(selected_item)
     
     if 0 <= row_index_to_remove < len(app_state['selected_generating_tags']):
@@ -2255,7 +4546,7 @@ def generate_random_tag_set():
         random_tag = random.choice(category['tags'])
         random_tags.append({
             'en': random_tag['en'],
-            'ja': random_tag.get('ja', ''),
+            'ja': random_tag.get('ja') or '',
             'category_path': get_category_path(category['id'])
         })
     app_state['random_generated_tags'] = random_tags
@@ -2292,7 +4583,162 @@ def add_random_tags_to_selected():
     messagebox.showinfo("情報", f"{added_count}件のランダムタグを選択済みタグに追加しました。")
 
 
+# --- コマンドラインからの一括分類 (Tkを使用しない) ---
+# 一度に分類するタグ数の既定値
+CLI_CHUNK_SIZE = 10000
+# テキストファイルを読み込む単位 (文字数)
+CLI_READ_BLOCK_SIZE = 1 << 20
+
+def iter_tag_chunks_from_file(filepath, chunk_size=CLI_CHUNK_SIZE):
+    """未分類タグファイルを少しずつ読み込み、タグのリストをチャンク単位で返すジェネレータ
+
+    分類タブと同じく、.csv は1列目 (先頭行は見出し)、それ以外はカンマ・改行区切りとして扱う。
+    """
+    chunk = []
+    if filepath.endswith('.csv'):
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None) # 見出し行をスキップ
+            for row in reader:
+                if row and row[0].strip():
+                    chunk.append(row[0].strip())
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+    else:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            remainder = ""
+            while True:
+                block = f.read(CLI_READ_BLOCK_SIZE)
+                if not block:
+                    break
+                # 最後の区切り文字以降はタグの途中の可能性があるため次のブロックに持ち越す
+                parts = re.split(r'[,\n]+', remainder + block)
+                remainder = parts.pop()
+                for tag in parts:
+                    if tag.strip():
+                        chunk.append(tag.strip())
+                        if len(chunk) >= chunk_size:
+                            yield chunk
+                            chunk = []
+            if remainder.strip():
+                chunk.append(remainder.strip())
+    if chunk:
+        yield chunk
+
+def read_dictionary_from_path(dictionary_path):
+    """辞書の保存先 (JSON / SQLite / シャードのディレクトリ) から辞書を読み込む関数 (保存先は変更しない)"""
+    storage = open_dictionary_storage(dictionary_path)
+    if isinstance(storage, JsonDictionaryStorage):
+        # GUIで追記されたまま未統合の変更も反映する (ジャーナルファイルは変更しない)
+        return storage.load(repair_journal=False)
+    dictionary = storage.load()
+    storage.close(dictionary)
+    return dictionary
+
+def run_batch_classification(dictionary_path, input_paths, output_path, chunk_size=CLI_CHUNK_SIZE, workers=None):
+    """辞書を読み込み、入力ファイルのタグを分類ヒント付きでCSVに書き出す関数 (戻り値は処理したタグ数)"""
+    # 辞書の内容が前回と同じならキャッシュから検索インデックスの派生構造を読み込む
+    set_dictionary(read_dictionary_from_path(dictionary_path), background_index=True, dictionary_path=dictionary_path)
+    get_tag_index(wait=True)
+
+    workers = get_classify_workers(workers)
+    input_chunks = ((input_path, tags_chunk) for input_path in input_paths
+                    for tags_chunk in iter_tag_chunks_from_file(input_path, chunk_size))
+    # 並列にするかはチャンクごとではなく入力全体のタグ数で決める。入力を2回読まないよう、
+    # タグ数が CLASSIFY_PARALLEL_MIN_TAGS に達するまでのチャンクだけを先読みし、達しなければ入力全体が逐次処理の対象になる
+    read_ahead_chunks = []
+    read_ahead_count = 0
+    if workers > 1:
+        for input_path, tags_chunk in input_chunks:
+            read_ahead_chunks.append((input_path, tags_chunk))
+            read_ahead_count += len(tags_chunk)
+            if read_ahead_count >= CLASSIFY_PARALLEL_MIN_TAGS:
+                break
+    parallel = read_ahead_count >= CLASSIFY_PARALLEL_MIN_TAGS
+
+    processed_count = 0
+    try:
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as out:
+            write_header = True
+            for input_path, tags_chunk in itertools.chain(read_ahead_chunks, input_chunks):
+                # 辞書は実行中に変わらないため、全チャンクで同じプロセスプールを使う
+                hints_table = get_classification_hints_batch(tags_chunk, workers=workers, parallel=parallel)
+                hints_table.write_csv(out, header=write_header)
+                write_header = False
+                processed_count += len(tags_chunk)
+                print(f"{input_path}: {processed_count}件のタグを分類しました。", file=sys.stderr)
+            if write_header:
+                # 入力が空でも見出し行は出力する
+                get_classification_hints_batch([], parallel=False).write_csv(out, header=True)
+    finally:
+        classification_pool.shutdown()
+    return processed_count
+
+def run_lookup(image_path, tags):
+    """辞書イメージから英語タグ名を引き、英語タグ名・日本語説明・カテゴリパスをタブ区切りで出力する関数 (戻り値は見つかった件数)"""
+    found_count = 0
+    with DictionaryImage(image_path) as image:
+        for tag_en in tags:
+            found = image.find_tag(tag_en)
+            if found is None:
+                print(f"{tag_en}\t\t")
+                continue
+            category_id, dict_tag_en, tag_ja = found
+            print(f"{dict_tag_en}\t{tag_ja}\t{image.get_category_path(category_id)}")
+            found_count += 1
+    return found_count
+
+def run_cli(argv):
+    """コマンドライン引数を解釈して一括分類などを実行する関数"""
+    parser = argparse.ArgumentParser(description="タグ辞書を使って未分類タグを一括分類します (GUIは起動しません)。")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    classify_parser = subparsers.add_parser("classify", help="未分類タグファイル (.txt / .csv) を分類してCSVに書き出す")
+    classify_parser.add_argument("inputs", nargs="+", help="未分類タグファイル (.txt はカンマ・改行区切り、.csv は1列目)")
+    classify_parser.add_argument("-o", "--output", required=True, help="出力CSVファイル (英語タグ名, 日本語説明, カテゴリ)")
+    classify_parser.add_argument("-d", "--dictionary", default=DATA_FILE, help=f"辞書JSONファイル (既定: {DATA_FILE})")
+    classify_parser.add_argument("--chunk-size", type=int, default=CLI_CHUNK_SIZE, help="一度に分類するタグ数")
+    classify_parser.add_argument("--workers", type=int, default=None, help="分類に使うワーカープロセス数 (既定: CPUコア数)")
+
+    export_image_parser = subparsers.add_parser("export-image", help="辞書を複数プロセスで共有できる読み取り専用の辞書イメージに書き出す")
+    export_image_parser.add_argument("-d", "--dictionary", default=DATA_FILE, help=f"辞書JSONファイル (既定: {DATA_FILE})")
+    export_image_parser.add_argument("-o", "--output", default=DICTIONARY_IMAGE_FILE, help=f"出力する辞書イメージ (既定: {DICTIONARY_IMAGE_FILE})")
+
+    lookup_parser = subparsers.add_parser("lookup", help="辞書イメージから英語タグ名の日本語説明とカテゴリを引く")
+    lookup_parser.add_argument("tags", nargs="+", help="英語タグ名 (大文字小文字は区別しない)")
+    lookup_parser.add_argument("-i", "--image", default=DICTIONARY_IMAGE_FILE, help=f"辞書イメージ (既定: {DICTIONARY_IMAGE_FILE})")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "export-image":
+            dictionary = read_dictionary_from_path(args.dictionary)
+            write_dictionary_image(dictionary, args.output)
+            tag_count = sum(len(category.get('tags', [])) for category in dictionary.get('categories', []))
+            print(f"{len(dictionary.get('categories', []))}件のカテゴリと{tag_count}件のタグを {args.output} に書き出しました。", file=sys.stderr)
+            return 0
+        if args.command == "lookup":
+            found_count = run_lookup(args.image, args.tags)
+            return 0 if found_count == len(args.tags) else 2
+        processed_count = run_batch_classification(args.dictionary, args.inputs, args.output, args.chunk_size, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return 1
+    print(f"{processed_count}件のタグを分類し、{args.output} に書き出しました。", file=sys.stderr)
+    return 0
+
+
 # --- メインアプリケーションのセットアップ ---
+def on_app_close():
+    """アプリ終了時に保存待ちの変更を書き込み、完了を待ってからウィンドウを閉じる関数"""
+    try:
+        get_dictionary_storage().close(app_state['dictionary'])
+    except Exception as e:
+        if not messagebox.askyesno("エラー", f"辞書ファイルの保存中にエラーが発生しました: {e}\n保存せずに終了しますか？"):
+            return
+    classification_pool.shutdown()
+    root.destroy()
+
 def main():
     global root, notebook, all_category_options, all_category_path_to_id
 
@@ -2302,6 +4748,10 @@ def main():
 
     # ここでまず辞書をロードし、all_category_options を初期化する
     load_dictionary()
+    # 起動時に読み込んだ辞書データは長く残るため、以降のGCで毎回たどらないよう起動時に1回だけ永続世代に移す
+    # (先に回収しておき、その時点の循環参照のごみを永続世代に残さない)
+    gc.collect()
+    gc.freeze()
 
     notebook = ttk.Notebook(root)
     notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -2330,9 +4780,16 @@ def main():
     # アプリケーション起動時にドロップダウンリストの値を更新
     update_category_dropdowns()
 
+    # 終了時にジャーナルを辞書ファイルへ統合する
+    root.protocol("WM_DELETE_WINDOW", on_app_close)
+
     root.mainloop()
 
 if __name__ == "__main__":
+    # 引数が指定された場合はGUIを起動せずにコマンドラインとして実行する
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+
     # グローバル変数を初期化
     category_hierarchy_tree_manage = None
     category_hierarchy_tree_classify = None
@@ -2364,6 +4821,7 @@ if __name__ == "__main__":
     dict_search_entry = None
     dict_filter_var = None
     dict_filter_combobox = None
+    save_dict_changes_button = None
     
     try:
         main()